@@ -0,0 +1,243 @@
+from collections import Counter
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTNot, ASTVariable
+
+FALSE = 0
+TRUE = 1
+
+
+def appearance_order(ast):
+    order = {}
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTVariable):
+            order.setdefault(node.token)
+        stack.extend(reversed(node.children))
+    return list(order)
+
+
+def frequency_order(ast):
+    counts = Counter()
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTVariable):
+            counts[node.token] += 1
+        stack.extend(node.children)
+    return sorted(appearance_order(ast), key=lambda name: -counts[name])
+
+
+ORDERINGS = {"appearance": appearance_order, "frequency": frequency_order}
+
+
+class Manager:
+    def __init__(self, order=None):
+        self.names = []
+        self.levels = {}
+        self.nodes = [(float("inf"), FALSE, FALSE), (float("inf"), TRUE, TRUE)]
+        self.unique = {}
+        self.cache = {}
+        for name in order or ():
+            self.declare(name)
+
+    def declare(self, name):
+        if name not in self.levels:
+            self.levels[name] = len(self.names)
+            self.names.append(name)
+        return self.levels[name]
+
+    def level(self, node):
+        return self.nodes[node][0]
+
+    def node(self, level, low, high):
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self.unique:
+            self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.unique[key]
+
+    def variable(self, name):
+        return self.node(self.declare(name), FALSE, TRUE)
+
+    def cofactors(self, node, level):
+        node_level, low, high = self.nodes[node]
+        if node_level == level:
+            return low, high
+        return node, node
+
+    def ite(self, condition, then, otherwise):
+        if condition == TRUE:
+            return then
+        if condition == FALSE:
+            return otherwise
+        if then == otherwise:
+            return then
+        if then == TRUE and otherwise == FALSE:
+            return condition
+        key = (condition, then, otherwise)
+        if key in self.cache:
+            return self.cache[key]
+        level = min(self.level(condition), self.level(then), self.level(otherwise))
+        condition_low, condition_high = self.cofactors(condition, level)
+        then_low, then_high = self.cofactors(then, level)
+        otherwise_low, otherwise_high = self.cofactors(otherwise, level)
+        result = self.node(
+            level,
+            self.ite(condition_low, then_low, otherwise_low),
+            self.ite(condition_high, then_high, otherwise_high)
+        )
+        self.cache[key] = result
+        return result
+
+    def negate(self, node):
+        return self.ite(node, FALSE, TRUE)
+
+    def conjoin(self, left, right):
+        return self.ite(left, right, FALSE)
+
+    def disjoin(self, left, right):
+        return self.ite(left, TRUE, right)
+
+    def implies(self, left, right):
+        return self.ite(left, right, TRUE)
+
+    def build(self, ast):
+        built = {}
+
+        def build(node):
+            if node in built:
+                return built[node]
+            if isinstance(node, ASTVariable):
+                if isinstance(node.token, int):
+                    raise ValueError(f"Cannot build BDD for bound variable '{node.unparse()}'")
+                result = self.variable(node.token)
+            elif isinstance(node, ASTNot):
+                result = self.negate(build(node.child))
+            elif isinstance(node, ASTAnd):
+                result = self.conjoin(build(node.left), build(node.right))
+            elif isinstance(node, ASTOr):
+                result = self.disjoin(build(node.left), build(node.right))
+            elif isinstance(node, ASTImplication):
+                result = self.implies(build(node.left), build(node.right))
+            else:
+                raise ValueError(f"Cannot build BDD for '{node.unparse()}'")
+            built[node] = result
+            return result
+        return build(ast)
+
+    def restrict(self, node, assignment):
+        levels = {self.levels[name]: value for name, value in assignment.items() if name in self.levels}
+        restricted = {}
+
+        def restrict(node):
+            if node in (FALSE, TRUE):
+                return node
+            if node not in restricted:
+                level, low, high = self.nodes[node]
+                if level in levels:
+                    restricted[node] = restrict(high if levels[level] else low)
+                else:
+                    restricted[node] = self.node(level, restrict(low), restrict(high))
+            return restricted[node]
+        return restrict(node)
+
+    def count(self, node, variables=None):
+        variables = len(self.names) if variables is None else variables
+        counts = {FALSE: 0, TRUE: 1}
+
+        def depth(node):
+            return min(self.level(node), variables)
+
+        def count(node):
+            if node not in counts:
+                level, low, high = self.nodes[node]
+                counts[node] = count(low) * 2 ** (depth(low) - level - 1)\
+                    + count(high) * 2 ** (depth(high) - level - 1)
+            return counts[node]
+        return count(node) * 2 ** depth(node)
+
+    def satisfying(self, node):
+        if node == FALSE:
+            return None
+        valuation = {}
+        while node != TRUE:
+            level, low, high = self.nodes[node]
+            if low != FALSE:
+                valuation[self.names[level]] = False
+                node = low
+            else:
+                valuation[self.names[level]] = True
+                node = high
+        return valuation
+
+    def size(self, node):
+        seen = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if node not in (FALSE, TRUE):
+                stack.extend(self.nodes[node][1:])
+        return len(seen)
+
+
+class BDD:
+    def __init__(self, manager, node):
+        self.manager = manager
+        self.node = node
+
+    def wrap(self, node):
+        return BDD(self.manager, node)
+
+    def __eq__(self, other):
+        if not isinstance(other, BDD):
+            return NotImplemented
+        if self.manager is not other.manager:
+            raise ValueError("Cannot compare BDDs from different managers")
+        return self.node == other.node
+
+    def __hash__(self):
+        return hash(self.node)
+
+    def __invert__(self):
+        return self.wrap(self.manager.negate(self.node))
+
+    def __and__(self, other):
+        return self.wrap(self.manager.conjoin(self.node, other.node))
+
+    def __or__(self, other):
+        return self.wrap(self.manager.disjoin(self.node, other.node))
+
+    def implies(self, other):
+        return self.wrap(self.manager.implies(self.node, other.node))
+
+    def restrict(self, assignment):
+        return self.wrap(self.manager.restrict(self.node, assignment))
+
+    def count(self, variables=None):
+        return self.manager.count(self.node, variables)
+
+    def satisfying(self):
+        return self.manager.satisfying(self.node)
+
+    def is_true(self):
+        return self.node == TRUE
+
+    def is_false(self):
+        return self.node == FALSE
+
+    def __len__(self):
+        return self.manager.size(self.node)
+
+
+def build(ast, manager=None, ordering="appearance"):
+    if manager is None:
+        manager = Manager(ORDERINGS[ordering](ast))
+    else:
+        for name in ORDERINGS[ordering](ast):
+            manager.declare(name)
+    return BDD(manager, manager.build(ast))
@@ -0,0 +1,54 @@
+from argparse import ArgumentParser
+from time import perf_counter
+from formula import Formula, Model
+
+FORMULAS = [
+    "forall x. exists y. R(x, y) ^ (y != x)",
+    "forall x. forall y. R(x, y) -> R(add(x, y), add(y, x))",
+    "forall x. forall y. exists z. P(x, y, z)",
+    "forall x. forall y. (forall z. P(x, z, add(x, z))) v R(x, y)",
+]
+
+
+def model(size):
+    return Model(range(size), {
+        "0": lambda: 0,
+        "add": lambda x, y: (x + y) % size
+    }, {
+        "R": lambda x, y: (x + y) % 3 != 0,
+        "P": lambda x, y, z: (x + y) % size == z
+    })
+
+
+def measure(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        result = function()
+        best = min(best, perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = ArgumentParser(description="Compare the AST interpreter against compiled formulas")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    universe = model(args.size)
+    for string in FORMULAS:
+        formula = Formula(string, True)
+        interpreted, expected = measure(lambda: formula.ast.value({}, universe), args.repeat)
+        compiled_formula = formula.compile(universe)
+        compiled, result = measure(compiled_formula.value, args.repeat)
+        memoized, memoized_result = measure(formula.compile(universe, args.cache_size).value, 1)
+        if result != expected or memoized_result != expected:
+            raise AssertionError(f"Compiled results {result}, {memoized_result} != interpreted result {expected} "
+                                 f"for '{string}'")
+        print(f"{string}\n    interpreted {interpreted:.4f}s, compiled {compiled:.4f}s, "
+              f"speedup {interpreted / compiled:.1f}x, memoized {memoized:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
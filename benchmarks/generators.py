@@ -0,0 +1,82 @@
+from itertools import product
+from random import Random
+from formula import Language, Model, Relation, Operation
+
+CONNECTIVES = {"^": 3, "v": 3, "->": 2, "~": 2, "==": 1}
+
+
+def default_language():
+    return Language({"c": 0, "d": 0, "f": 1, "g": 2}, {"P": 1, "R": 2, "S": 3})
+
+
+class FormulaGenerator:
+    def __init__(self, language=None, seed=0, depth=4, quantifier_depth=2, term_depth=1, connectives=None,
+                 quantifier_rate=0.3):
+        self.language = language or default_language()
+        self.random = Random(seed)
+        self.depth = depth
+        self.quantifier_depth = quantifier_depth
+        self.term_depth = term_depth
+        self.quantifier_rate = quantifier_rate
+        weights = connectives or CONNECTIVES
+        self.connectives = list(weights)
+        self.weights = [weights[connective] for connective in self.connectives]
+        self.constants = [name for name, arity in self.language.function_arities.items() if arity == 0]
+        self.functions = [name for name, arity in self.language.function_arities.items() if arity > 0]
+        self.predicates = list(self.language.predicate_arities)
+        if not self.predicates:
+            raise ValueError("Language needs at least one predicate")
+
+    def term(self, depth, bound):
+        leaves = bound + self.constants
+        if not leaves or (self.functions and depth > 0 and self.random.random() < 0.5):
+            if not self.functions:
+                raise ValueError("Language needs a constant, a function or a quantifier to build terms")
+            name = self.random.choice(self.functions)
+            arity = self.language.function_arities[name]
+            return f"{name}({', '.join(self.term(depth - 1, bound) for _ in range(arity))})"
+        return self.random.choice(leaves)
+
+    def atom(self, bound):
+        if "==" in self.connectives and self.random.random() < self.weights[self.connectives.index("==")]\
+                / sum(self.weights):
+            return f"({self.term(self.term_depth, bound)} {self.random.choice(['==', '!='])} "\
+                   f"{self.term(self.term_depth, bound)})"
+        name = self.random.choice(self.predicates)
+        arity = self.language.predicate_arities[name]
+        return f"{name}({', '.join(self.term(self.term_depth, bound) for _ in range(arity))})"
+
+    def formula(self, depth=None, bound=None):
+        depth = self.depth if depth is None else depth
+        bound = [] if bound is None else bound
+        if len(bound) < self.quantifier_depth\
+                and ((not bound and not self.constants) or self.random.random() < self.quantifier_rate):
+            variable = f"x{len(bound)}"
+            quantifier = self.random.choice(["forall", "exists"])
+            return f"({quantifier} {variable}. {self.formula(depth, bound + [variable])})"
+        if depth == 0:
+            return self.atom(bound)
+        connective = self.random.choices(self.connectives, self.weights)[0]
+        if connective == "==":
+            return self.atom(bound)
+        if connective == "~":
+            return f"~({self.formula(depth - 1, bound)})"
+        return f"({self.formula(depth - 1, bound)}) {connective} ({self.formula(depth - 1, bound)})"
+
+    def formulas(self, count):
+        return [self.formula() for _ in range(count)]
+
+
+def random_model(size, language=None, seed=0, density=0.5):
+    language = language or default_language()
+    random = Random(seed)
+    universe = range(size)
+    functions = {
+        name: Operation({args: random.randrange(size) for args in product(universe, repeat=arity)})
+        for name, arity in language.function_arities.items()
+    }
+    predicates = {
+        name: Relation(args for args in product(universe, repeat=arity) if random.random() < density)
+        for name, arity in language.predicate_arities.items()
+    }
+    return Model(universe, functions, predicates)
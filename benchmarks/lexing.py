@@ -0,0 +1,31 @@
+from argparse import ArgumentParser
+from time import perf_counter
+from tokenizer import tokenize
+
+
+def generate(atoms):
+    parts = []
+    for i in range(atoms):
+        parts.append(f"forall x{i}. (P(x{i}, add(y, {i})) -> ~Q(x{i}) or R(y, z{i}))")
+    return " and ".join(f"({part})" for part in parts)
+
+
+def main():
+    parser = ArgumentParser(description="Measure tokenizer throughput on large generated formulas")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for atoms in args.sizes:
+        string = generate(atoms)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = perf_counter()
+            tokens = tokenize(string)
+            best = min(best, perf_counter() - start)
+        count = len(tokens.data)
+        print(f"{len(string):>10} chars {count:>9} tokens {best:.4f}s {count / best:>12,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from time import perf_counter
+from formula import Formula
+from parser import Parser
+from tokenizer import tokenize
+from benchmarks.generators import FormulaGenerator, random_model
+
+PHASES = ["tokenize", "parse", "formula", "value"]
+
+
+def phases(strings, model):
+    yield "tokenize", lambda: [tokenize(string) for string in strings]
+    yield "parse", lambda: [Parser(string, True).parse() for string in strings]
+    yield "formula", lambda: [Formula(string, True) for string in strings]
+    asts = [Formula(string, True).ast for string in strings]
+    yield "value", lambda: [ast.value({}, model) for ast in asts]
+
+
+def measure(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(config):
+    generator = FormulaGenerator(seed=config["seed"], depth=config["depth"],
+                                 quantifier_depth=config["quantifier_depth"])
+    strings = generator.formulas(config["count"])
+    model = random_model(config["universe"], seed=config["seed"])
+    results = {}
+    for name, function in phases(strings, model):
+        seconds, peak = measure(function, config["repeat"])
+        results[name] = {"seconds": seconds, "throughput": config["count"] / seconds, "peak_bytes": peak}
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name in PHASES:
+        if name not in baseline:
+            continue
+        ratio = results[name]["seconds"] / baseline[name]["seconds"]
+        memory = results[name]["peak_bytes"] / max(baseline[name]["peak_bytes"], 1)
+        flag = ""
+        if ratio > 1 + threshold or memory > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<10} time {ratio:>6.2f}x  memory {memory:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Time tokenizing, parsing, validation and evaluation of random formulas")
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--quantifier-depth", type=int, default=2)
+    parser.add_argument("--universe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    config = {name: getattr(args, name)
+              for name in ("count", "depth", "quantifier_depth", "universe", "seed", "repeat")}
+    results = run(config)
+    for name in PHASES:
+        result = results[name]
+        print(f"{name:<10} {result['seconds']:>9.4f}s {result['throughput']:>12,.0f} formulas/s "
+              f"peak {result['peak_bytes'] / 1024:>10,.1f} KiB")
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"config": config, "results": results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["config"] != config:
+            print(f"warning: baseline was recorded with {baseline['config']}")
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from time import perf_counter
+from formula import Formula, Model, freeze
+from parser import ParsingError
+from syntax import ASTValidationError, LanguageValidationError, DepthError
+import parallel
+
+BATCH_SIZE = 64
+BATCHES_PER_WORKER = 4
+
+
+def error_position(error, string):
+    if isinstance(error, ParsingError):
+        return error.token.part if error.token.part >= 0 else len(string)
+    if isinstance(error, ASTValidationError):
+        return error.token.part if error.token.part >= 0 else None
+    if isinstance(error, ValueError) and error.args and isinstance(error.args[0], str)\
+            and string.endswith(error.args[0]):
+        return len(string) - len(error.args[0])
+    return None
+
+
+def describe(error, string):
+    if isinstance(error, (ParsingError, LanguageValidationError)):
+        message = error.msg
+    elif isinstance(error, KeyError) and error.args:
+        message = str(error.args[0])
+    else:
+        message = str(error)
+    return {"type": type(error).__name__, "message": message, "position": error_position(error, string)}
+
+
+def evaluate(formula, model, valuation):
+    try:
+        return bool(formula.compile(model).value(valuation))
+    except DepthError:
+        return bool(formula.ast.value(dict(valuation), model))
+
+
+def process(state, number, string):
+    result = {"line": number, "input": string}
+    start = perf_counter()
+    try:
+        formula = Formula(string, state["first_order"])
+    except (ParsingError, ASTValidationError, LanguageValidationError, ValueError) as error:
+        result.update(valid=False, error=describe(error, string), time={"parse": perf_counter() - start})
+        return result
+    result.update(valid=True, unparse=formula.ast.unparse(), time={"parse": perf_counter() - start})
+    if state["model"] is not None:
+        start = perf_counter()
+        try:
+            result["value"] = evaluate(formula, state["model"], state["valuation"])
+        except (KeyError, ValueError, TypeError) as error:
+            result["error"] = describe(error, string)
+        result["time"]["evaluate"] = perf_counter() - start
+    return result
+
+
+def process_batch(batch):
+    return [json.dumps(process(parallel.worker, number, string)) for number, string in batch]
+
+
+def batches(lines, size):
+    numbered = ((number, line.rstrip("\r\n")) for number, line in enumerate(lines, 1))
+    numbered = ((number, line) for number, line in numbered if line.strip() and not line.startswith("#"))
+    while True:
+        batch = list(islice(numbered, size))
+        if not batch:
+            return
+        yield batch
+
+
+def stream(lines, state, workers=None, batch_size=BATCH_SIZE, window=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        parallel.initialize(state)
+        for batch in batches(lines, batch_size):
+            yield from process_batch(batch)
+        return
+    window = window or workers * BATCHES_PER_WORKER
+    executor = ProcessPoolExecutor(
+        workers, mp_context=get_context("fork"), initializer=parallel.initialize, initargs=(state,)
+    )
+    pending = deque()
+    try:
+        for batch in batches(lines, batch_size):
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(process_batch, batch))
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description="Parse, validate and evaluate formulas line by line.")
+    arguments.add_argument("input", nargs="?", default="-", help="file with one formula per line (default: stdin)")
+    arguments.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    arguments.add_argument("-m", "--model", help="JSON model to evaluate every formula against")
+    arguments.add_argument("-p", "--propositional", action="store_true", help="parse propositional formulas")
+    arguments.add_argument("-w", "--workers", type=int, help="worker processes (default: CPU count)")
+    arguments.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE, help="formulas per task")
+    arguments.add_argument("--window", type=int, help="maximum batches in flight (default: 4 per worker)")
+    options = arguments.parse_args(argv)
+
+    model, valuation = None, {}
+    if options.model is not None:
+        with open(options.model) as file:
+            data = json.load(file)
+        model = Model.from_dict(data)
+        valuation = {name: freeze(value) for name, value in data.get("valuation", {}).items()}
+    state = {"first_order": not options.propositional, "model": model, "valuation": valuation}
+
+    source = sys.stdin if options.input == "-" else open(options.input)
+    target = sys.stdout if options.output == "-" else open(options.output, "w")
+    try:
+        for line in stream(source, state, options.workers, options.batch_size, options.window):
+            target.write(line + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
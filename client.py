@@ -0,0 +1,114 @@
+import asyncio
+import json
+from collections import deque
+from itertools import count
+
+PORT = 7878
+LINE_LIMIT = 1 << 26
+WINDOW = 1024
+
+
+class ServerError(Exception):
+    def __init__(self, error):
+        self.type = error["type"]
+        self.message = error["message"]
+        self.position = error.get("position")
+
+    def __str__(self):
+        return f"{self.type}: {self.message}"
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = count()
+        self.pending = {}
+        self.receiver = asyncio.get_running_loop().create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=PORT, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self.receiver
+
+    async def receive(self):
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self.pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except ConnectionError:
+            pass
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to server closed"))
+            self.pending.clear()
+
+    def submit(self, op, **fields):
+        if self.receiver.done():
+            raise ConnectionError("Connection to server closed")
+        identifier = next(self.ids)
+        future = self.pending[identifier] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps({"id": identifier, "op": op, **fields}).encode() + b"\n")
+        return future
+
+    @staticmethod
+    def result(response, key):
+        if "error" in response:
+            raise ServerError(response["error"])
+        return response[key]
+
+    async def request(self, op, key, **fields):
+        future = self.submit(op, **fields)
+        await self.writer.drain()
+        return self.result(await future, key)
+
+    async def register_model(self, name, model):
+        return await self.request("model", "name", name=name, model=model)
+
+    async def register_language(self, name, functions=None, predicates=None):
+        return await self.request("language", "name", name=name, functions=functions or {},
+                                  predicates=predicates or {})
+
+    async def check(self, formula, model, valuation=None, first_order=True, language=None):
+        return await self.request("check", "value", formula=formula, model=model, valuation=valuation or {},
+                                  first_order=first_order, language=language)
+
+    async def parse(self, formula, first_order=True, language=None):
+        return await self.request("parse", "unparse", formula=formula, first_order=first_order, language=language)
+
+    async def stats(self):
+        return await self.request("stats", "statistics")
+
+    async def check_many(self, formulas, model, valuation=None, first_order=True, language=None, window=WINDOW):
+        fields = {"model": model, "valuation": valuation or {}, "first_order": first_order, "language": language}
+        results = []
+        in_flight = deque()
+        for formula in formulas:
+            if len(in_flight) >= window:
+                await self.writer.drain()
+                results.append(await in_flight.popleft())
+            in_flight.append(self.submit("check", formula=formula, **fields))
+        await self.writer.drain()
+        while in_flight:
+            results.append(await in_flight.popleft())
+        return [ServerError(response["error"]) if "error" in response else response["value"] for response in results]
@@ -0,0 +1,163 @@
+from syntax import ASTAnd, ASTEquality, ASTInequality, ASTNot, ASTVariable
+
+
+class CongruenceClosure:
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+        self.symbols = []
+        self.arguments = []
+        self.parent = []
+        self.size = []
+        self.uses = []
+        self.signatures = {}
+        self.distinct = []
+        self.pending = []
+
+    def __len__(self):
+        return len(self.terms)
+
+    def copy(self):
+        other = CongruenceClosure.__new__(CongruenceClosure)
+        other.ids = dict(self.ids)
+        other.terms = list(self.terms)
+        other.symbols = list(self.symbols)
+        other.arguments = list(self.arguments)
+        other.parent = list(self.parent)
+        other.size = list(self.size)
+        other.uses = [list(uses) for uses in self.uses]
+        other.signatures = dict(self.signatures)
+        other.distinct = list(self.distinct)
+        other.pending = []
+        return other
+
+    def find(self, term):
+        parent = self.parent
+        root = term
+        while parent[root] != root:
+            root = parent[root]
+        while parent[term] != root:
+            parent[term], term = root, parent[term]
+        return root
+
+    def signature(self, term):
+        return self.symbols[term], tuple(self.find(argument) for argument in self.arguments[term])
+
+    def add(self, node):
+        stack = [(node, False)]
+        while stack:
+            term, expanded = stack.pop()
+            if term in self.ids:
+                continue
+            if not term.is_term or isinstance(term, ASTVariable) and isinstance(term.token, int):
+                raise ValueError(f"'{term.unparse()}' is not a ground term")
+            if not expanded and term.children:
+                stack.append((term, True))
+                stack.extend((child, False) for child in reversed(term.children))
+                continue
+            identifier = len(self.terms)
+            self.ids[term] = identifier
+            self.terms.append(term)
+            self.symbols.append(term.token)
+            self.arguments.append(tuple(self.ids[child] for child in term.children))
+            self.parent.append(identifier)
+            self.size.append(1)
+            self.uses.append([])
+            if not term.children:
+                continue
+            for argument in set(self.find(argument) for argument in self.arguments[identifier]):
+                self.uses[argument].append(identifier)
+            signature = self.signature(identifier)
+            if signature in self.signatures:
+                self.pending.append((identifier, self.signatures[signature]))
+            else:
+                self.signatures[signature] = identifier
+        self.propagate()
+        return self.ids[node]
+
+    def propagate(self):
+        while self.pending:
+            left, right = self.pending.pop()
+            left, right = self.find(left), self.find(right)
+            if left == right:
+                continue
+            if self.size[left] < self.size[right]:
+                left, right = right, left
+            self.parent[right] = left
+            self.size[left] += self.size[right]
+            uses, self.uses[right] = self.uses[right], []
+            for term in uses:
+                signature = self.signature(term)
+                existing = self.signatures.setdefault(signature, term)
+                if existing != term and self.find(existing) != self.find(term):
+                    self.pending.append((term, existing))
+            self.uses[left].extend(uses)
+
+    def merge(self, left, right):
+        self.pending.append((self.add(left), self.add(right)))
+        self.propagate()
+
+    def separate(self, left, right):
+        self.distinct.append((self.add(left), self.add(right)))
+
+    def equal(self, left, right):
+        left, right = self.add(left), self.add(right)
+        return self.find(left) == self.find(right)
+
+    def add_formula(self, ast):
+        for positive, left, right in literals(ast):
+            if positive:
+                self.merge(left, right)
+            else:
+                self.separate(left, right)
+
+    @property
+    def consistent(self):
+        return all(self.find(left) != self.find(right) for left, right in self.distinct)
+
+    def distinguishes(self, left, right):
+        if self.equal(left, right):
+            return False
+        other = self.copy()
+        other.merge(left, right)
+        return not other.consistent
+
+    def classes(self):
+        classes = {}
+        for identifier, term in enumerate(self.terms):
+            classes.setdefault(self.find(identifier), []).append(term)
+        return list(classes.values())
+
+
+def literals(ast):
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTAnd):
+            stack.extend(reversed(node.children))
+        elif isinstance(node, (ASTEquality, ASTInequality)):
+            yield isinstance(node, ASTEquality), node.left, node.right
+        elif isinstance(node, ASTNot) and isinstance(node.child, (ASTEquality, ASTInequality)):
+            yield isinstance(node.child, ASTInequality), node.child.left, node.child.right
+        else:
+            raise ValueError(f"'{node.unparse()}' is not a ground equality or inequality")
+
+
+def closure(ast):
+    engine = CongruenceClosure()
+    engine.add_formula(ast)
+    return engine
+
+
+def satisfiable(ast):
+    return closure(ast).consistent
+
+
+def entails(premises, conclusion):
+    engine = closure(premises)
+    if not engine.consistent:
+        return True
+    for positive, left, right in literals(conclusion):
+        if not (engine.equal(left, right) if positive else engine.distinguishes(left, right)):
+            return False
+    return True
@@ -0,0 +1,428 @@
+import re
+from parser import Parser, ParsingError
+from syntax import ASTValidationError, LanguageValidationError, ASTAnd, ASTOr, ASTImplication, ASTEquality,\
+    ASTNot, ASTQuantifier, ASTExists, ASTForAll, ASTVariable
+from tokenizer import Token
+
+RULES = {
+    "R": "reiteration",
+    "^I": "and_introduction",
+    "^E": "and_elimination",
+    "vI": "or_introduction",
+    "vE": "or_elimination",
+    "->I": "implication_introduction",
+    "->E": "implication_elimination",
+    "~I": "negation_introduction",
+    "~E": "negation_elimination",
+    "=I": "equality_introduction",
+    "=E": "equality_elimination",
+    "AI": "universal_introduction",
+    "AE": "universal_elimination",
+    "EI": "existential_introduction",
+    "EE": "existential_elimination",
+}
+QUANTIFIER_RULES = ("AI", "EE")
+
+LINE = re.compile(r"\s*(\d+)\.(?:\t| +)(\t*)(.*)$")
+JUSTIFICATION = re.compile(r"({})((?:\s*,\s*\d+(?:\s*-\s*\d+)?)*)\s*$".format(
+    "|".join(re.escape(rule) for rule in sorted(RULES, key=len, reverse=True))
+))
+CITATION = re.compile(r"(\d+)(?:\s*-\s*(\d+))?")
+IDENTIFIER = re.compile(r"[a-z0-9]+$")
+
+
+class ProofError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+class Line:
+    __slots__ = ("number", "text", "depth", "variable", "formula", "rule", "citations", "scope", "invalid", "error")
+
+    def __init__(self, number, text):
+        self.number = number
+        self.text = text
+        self.depth = 0
+        self.variable = None
+        self.formula = None
+        self.rule = None
+        self.citations = []
+        self.scope = None
+        self.invalid = None
+        self.error = None
+
+    def cited(self):
+        for citation in self.citations:
+            if isinstance(citation, tuple):
+                yield from citation
+            else:
+                yield citation
+
+
+class Scope:
+    __slots__ = ("start", "end", "parent", "variable")
+
+    def __init__(self, start, parent, variable=None):
+        self.start = start
+        self.end = start
+        self.parent = parent
+        self.variable = variable
+
+    def contains(self, number):
+        return self.start <= number <= self.end
+
+
+def bound(term):
+    stack = [term]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTVariable) and isinstance(node.token, int):
+            return True
+        stack.extend(node.children)
+    return False
+
+
+def match(pattern, target, reference, found):
+    if isinstance(pattern, ASTVariable) and isinstance(pattern.token, int) and pattern.token == reference:
+        if not target.is_term or bound(target):
+            return False
+        if found:
+            return found[0] == target
+        found.append(target)
+        return True
+    if pattern is target:
+        return True
+    if type(pattern) is not type(target) or pattern.token != target.token or pattern.arity != target.arity:
+        return False
+    offset = 1 if isinstance(pattern, ASTQuantifier) else 0
+    return all(match(child, other, reference + offset, found)
+               for child, other in zip(pattern.children, target.children))
+
+
+def instance(body, target):
+    found = []
+    if not match(body, target, 0, found):
+        return False, None
+    return True, found[0] if found else None
+
+
+def replaces(source, target, old, new):
+    if source == target or (source == old and target == new):
+        return True
+    if type(source) is not type(target) or source.token != target.token or source.arity != target.arity:
+        return False
+    return all(replaces(child, other, old, new) for child, other in zip(source.children, target.children))
+
+
+def contradiction(node):
+    if not isinstance(node, ASTAnd):
+        return False
+    return (isinstance(node.right, ASTNot) and node.right.child == node.left)\
+        or (isinstance(node.left, ASTNot) and node.left.child == node.right)
+
+
+class Proof:
+    def __init__(self, text, first_order=True, language=None):
+        self.first_order = first_order
+        self.language = language
+        self.lines = [self.parse_line(number, line)
+                      for number, line in enumerate((line for line in text.splitlines() if line.strip()), 1)]
+        self.citers = {}
+        self.boxes = {}
+        self.structural = {}
+        self.premises = None
+        self.structure()
+        self.index()
+        for line in self.lines:
+            self.check_line(line)
+
+    @classmethod
+    def from_file(cls, path, first_order=True, language=None):
+        with open(path) as file:
+            return cls(file.read(), first_order, language)
+
+    def parse_line(self, number, text):
+        line = Line(number, text)
+        found = LINE.match(text)
+        if not found:
+            line.invalid = "Malformed line"
+            return line
+        if int(found.group(1)) != number:
+            line.invalid = f"Expected line number {number}, got {found.group(1)}"
+        line.depth = len(found.group(2))
+        fields = [field.strip() for field in found.group(3).split("\t") if field.strip()]
+        if len(fields) >= 2:
+            justification = JUSTIFICATION.match(fields[-1])
+            if justification:
+                fields.pop()
+                line.rule = justification.group(1)
+                line.citations = [
+                    (int(start), int(end)) if end else int(start)
+                    for start, end in CITATION.findall(justification.group(2))
+                ]
+        if len(fields) == 2 and line.rule is None and IDENTIFIER.match(fields[0]):
+            line.variable = fields.pop(0)
+            line.depth += 1
+        if len(fields) != 1:
+            line.invalid = line.invalid or "Expected a formula followed by an optional justification"
+            return line
+        try:
+            line.formula = Parser(fields[0], self.first_order, self.language, self.language is not None).parse()
+        except (ParsingError, ASTValidationError, LanguageValidationError, ValueError) as error:
+            line.invalid = line.invalid or f"Invalid formula '{fields[0]}': {str(error).strip()}"
+        return line
+
+    def structure(self):
+        self.boxes = {}
+        self.structural = {}
+        self.premises = None
+        stack = [Scope(1, None)]
+        derived = False
+        for line in self.lines:
+            depth = line.depth
+            if depth > len(stack) or (depth == len(stack) and line.rule is not None):
+                self.structural[line.number] = "Subproof must start with an assumption"
+                depth = len(stack) - 1
+            while len(stack) - 1 > depth:
+                stack.pop().end = line.number - 1
+            if line.rule is None and depth > 0:
+                if len(stack) - 1 == depth:
+                    stack.pop().end = line.number - 1
+                scope = self.boxes[line.number] = Scope(line.number, stack[-1], line.variable)
+                stack.append(scope)
+            elif line.rule is None and derived:
+                self.structural[line.number] = "Premises must precede derived lines"
+            derived = derived or line.rule is not None
+            line.scope = stack[-1]
+        for scope in stack:
+            scope.end = len(self.lines)
+
+    def index(self):
+        self.citers = {}
+        for line in self.lines:
+            for number in line.cited():
+                self.citers.setdefault(number, set()).add(line.number)
+
+    def formula(self, number, at):
+        if isinstance(number, tuple):
+            raise ProofError(f"Expected a line, got subproof {number[0]}-{number[1]}")
+        if not 1 <= number < at:
+            raise ProofError(f"Line {number} cannot be cited from line {at}")
+        line = self.lines[number - 1]
+        if not line.scope.contains(at):
+            raise ProofError(f"Line {number} is not accessible from line {at}")
+        if line.formula is None:
+            raise ProofError(f"Line {number} has no valid formula")
+        return line.formula
+
+    def box(self, citation, at):
+        if not isinstance(citation, tuple):
+            raise ProofError(f"Expected a subproof, got line {citation}")
+        start, end = citation
+        scope = self.boxes.get(start)
+        if scope is None or scope.end != end:
+            raise ProofError(f"Lines {start}-{end} are not a subproof")
+        if end >= at or not scope.parent.contains(at):
+            raise ProofError(f"Subproof {start}-{end} is not accessible from line {at}")
+        first, last = self.lines[start - 1].formula, self.lines[end - 1].formula
+        if first is None or last is None:
+            raise ProofError(f"Subproof {start}-{end} has no valid formula")
+        return scope, first, last
+
+    def cite(self, line, *kinds):
+        if len(line.citations) != len(kinds):
+            raise ProofError(f"{line.rule} expects {len(kinds)} citation(s), got {len(line.citations)}")
+        return [self.box(citation, line.number) if kind == "box" else self.formula(citation, line.number)
+                for citation, kind in zip(line.citations, kinds)]
+
+    def premise_names(self):
+        if self.premises is None:
+            self.premises = frozenset().union(*(
+                line.formula.free for line in self.lines
+                if line.rule is None and line.depth == 0 and line.formula is not None
+            ))
+        return self.premises
+
+    def fresh(self, name, scope):
+        while scope.parent is not None:
+            assumption = self.lines[scope.start - 1].formula
+            if scope.variable == name or (assumption is not None and name in assumption.free):
+                return False
+            scope = scope.parent
+        return name not in self.premise_names()
+
+    def check_line(self, line):
+        line.error = line.invalid or self.structural.get(line.number)
+        if line.error is not None or line.rule is None:
+            return
+        try:
+            getattr(self, "rule_" + RULES[line.rule])(line, line.formula)
+        except ProofError as error:
+            line.error = str(error)
+
+    def rule_reiteration(self, line, formula):
+        cited, = self.cite(line, "line")
+        if not formula == cited:
+            raise ProofError("Reiterated formula differs from cited line")
+
+    def rule_and_introduction(self, line, formula):
+        first, second = self.cite(line, "line", "line")
+        if not isinstance(formula, ASTAnd) or {formula.left, formula.right} != {first, second}:
+            raise ProofError("Formula is not the conjunction of the cited lines")
+
+    def rule_and_elimination(self, line, formula):
+        cited, = self.cite(line, "line")
+        if not isinstance(cited, ASTAnd) or formula not in (cited.left, cited.right):
+            raise ProofError("Formula is not a conjunct of the cited line")
+
+    def rule_or_introduction(self, line, formula):
+        cited, = self.cite(line, "line")
+        if not isinstance(formula, ASTOr) or cited not in (formula.left, formula.right):
+            raise ProofError("Cited line is not a disjunct of the formula")
+
+    def rule_or_elimination(self, line, formula):
+        disjunction, (_, left, left_end), (_, right, right_end) = self.cite(line, "line", "box", "box")
+        if not isinstance(disjunction, ASTOr):
+            raise ProofError("First citation is not a disjunction")
+        if (left, right) not in ((disjunction.left, disjunction.right), (disjunction.right, disjunction.left)):
+            raise ProofError("Subproofs do not assume the disjuncts")
+        if not formula == left_end or not formula == right_end:
+            raise ProofError("Subproofs do not both end in the formula")
+
+    def rule_implication_introduction(self, line, formula):
+        (_, assumption, conclusion), = self.cite(line, "box")
+        if not isinstance(formula, ASTImplication) or not (formula.left == assumption and formula.right == conclusion):
+            raise ProofError("Formula does not match the subproof's assumption and conclusion")
+
+    def rule_implication_elimination(self, line, formula):
+        first, second = self.cite(line, "line", "line")
+        for implication, antecedent in ((first, second), (second, first)):
+            if isinstance(implication, ASTImplication) and implication.left == antecedent\
+                    and implication.right == formula:
+                return
+        raise ProofError("Cited lines do not give the formula by modus ponens")
+
+    def rule_negation_introduction(self, line, formula):
+        (_, assumption, conclusion), = self.cite(line, "box")
+        if not isinstance(formula, ASTNot) or not formula.child == assumption:
+            raise ProofError("Formula is not the negation of the subproof's assumption")
+        if not contradiction(conclusion):
+            raise ProofError("Subproof does not end in a contradiction")
+
+    def rule_negation_elimination(self, line, formula):
+        if line.citations and isinstance(line.citations[0], tuple):
+            (_, assumption, conclusion), = self.cite(line, "box")
+            if not isinstance(assumption, ASTNot) or not assumption.child == formula:
+                raise ProofError("Subproof does not assume the negation of the formula")
+            if not contradiction(conclusion):
+                raise ProofError("Subproof does not end in a contradiction")
+            return
+        cited, = self.cite(line, "line")
+        if not (isinstance(cited, ASTNot) and isinstance(cited.child, ASTNot) and cited.child.child == formula):
+            raise ProofError("Cited line is not the double negation of the formula")
+
+    def rule_equality_introduction(self, line, formula):
+        self.cite(line)
+        if not isinstance(formula, ASTEquality) or not formula.left == formula.right:
+            raise ProofError("Formula is not of the form t == t")
+
+    def rule_equality_elimination(self, line, formula):
+        first, second = self.cite(line, "line", "line")
+        for equality, source in ((first, second), (second, first)):
+            if isinstance(equality, ASTEquality) and (replaces(source, formula, equality.left, equality.right)
+                                                      or replaces(source, formula, equality.right, equality.left)):
+                return
+        raise ProofError("Formula does not follow by substituting equals")
+
+    def rule_universal_introduction(self, line, formula):
+        cited, = self.cite(line, "line")
+        if not isinstance(formula, ASTForAll):
+            raise ProofError("Formula is not universally quantified")
+        matched, term = instance(formula.child, cited)
+        if not matched:
+            raise ProofError("Cited line is not an instance of the formula")
+        if term is None:
+            return
+        if not isinstance(term, ASTVariable) or term.token in formula.free:
+            raise ProofError(f"'{term.unparse()}' is not a fresh name")
+        if not self.fresh(term.token, line.scope):
+            raise ProofError(f"'{term.token}' occurs in an open assumption")
+
+    def rule_universal_elimination(self, line, formula):
+        cited, = self.cite(line, "line")
+        if not isinstance(cited, ASTForAll) or not instance(cited.child, formula)[0]:
+            raise ProofError("Formula is not an instance of the cited line")
+
+    def rule_existential_introduction(self, line, formula):
+        cited, = self.cite(line, "line")
+        if not isinstance(formula, ASTExists) or not instance(formula.child, cited)[0]:
+            raise ProofError("Cited line is not an instance of the formula")
+
+    def rule_existential_elimination(self, line, formula):
+        existential, (scope, assumption, conclusion) = self.cite(line, "line", "box")
+        if not isinstance(existential, ASTExists):
+            raise ProofError("First citation is not existentially quantified")
+        if scope.variable is not None:
+            name = scope.variable
+            if not assumption.substitute_references(Token("id", name, name, -1), 0) == existential.child:
+                raise ProofError(f"Subproof does not assume an instance of the formula for '{name}'")
+        else:
+            matched, term = instance(existential.child, assumption)
+            if not matched or not isinstance(term, ASTVariable):
+                raise ProofError("Subproof does not assume an instance of the formula for a name")
+            name = term.token
+        if name in existential.free or name in formula.free:
+            raise ProofError(f"'{name}' is not a fresh name")
+        if not self.fresh(name, line.scope):
+            raise ProofError(f"'{name}' occurs in an open assumption")
+        if not formula == conclusion:
+            raise ProofError("Subproof does not end in the formula")
+
+    def edit(self, number, text):
+        if not 1 <= number <= len(self.lines):
+            raise ProofError(f"No line {number}")
+        old = self.lines[number - 1]
+        line = self.parse_line(number, text)
+        self.lines[number - 1] = line
+        if (old.depth, old.rule is None, old.variable) != (line.depth, line.rule is None, line.variable):
+            self.structure()
+            self.index()
+            for other in self.lines:
+                self.check_line(other)
+            return list(range(1, len(self.lines) + 1))
+        line.scope = old.scope
+        for cited in old.cited():
+            self.citers[cited].discard(number)
+        for cited in line.cited():
+            self.citers.setdefault(cited, set()).add(number)
+        affected = {number} | self.citers.get(number, set())
+        if line.rule is None:
+            self.premises = None
+            scope = self.boxes.get(number, line.scope)
+            affected.update(other.number for other in self.lines[scope.start - 1:scope.end]
+                            if other.rule in QUANTIFIER_RULES)
+        for other in sorted(affected):
+            self.check_line(self.lines[other - 1])
+        return sorted(affected)
+
+    @property
+    def errors(self):
+        return {line.number: line.error for line in self.lines if line.error is not None}
+
+    @property
+    def conclusion(self):
+        if not self.lines or self.lines[-1].depth != 0:
+            return None
+        return self.lines[-1].formula
+
+    def valid(self):
+        return not self.errors and self.conclusion is not None
+
+    def report(self):
+        lines = [f"{number}: {error}" for number, error in self.errors.items()]
+        if self.lines and self.lines[-1].depth != 0:
+            lines.append(f"{len(self.lines)}: Proof ends inside a subproof")
+        return "\n".join(lines) or "Proof is valid"
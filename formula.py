@@ -1,23 +1,260 @@
+from types import MappingProxyType
 from parser import Parser, ASTValidationError
+from syntax import CompilationContext, bounded
+import bdd
+import congruence
+import modelfinder
+import parallel
+import planner
+import profiling
+import sat
+import witness
 
 
 class Formula:
     def __init__(self, string, first_order, language=None):
         self.string = string
         self.first_order = first_order
-        self.ast = Parser(string).parse()
         self.language = language or Language()
+        parser = Parser(string, first_order, self.language, language is None)
+        self.ast = parser.parse()
+        self.positions = parser.positions
         if first_order and self.ast.is_term:
-            raise ASTValidationError(self.ast)
-        self.ast.validate(first_order)
-        self.ast.validate_language(self.language, language is None)
+            raise ASTValidationError(self.ast, parser.token)
+
+    @classmethod
+    def from_ast(cls, ast, first_order, language=None):
+        formula = cls.__new__(cls)
+        formula.string = ast.unparse()
+        formula.first_order = first_order
+        formula.ast = ast
+        formula.positions = None
+        formula.language = language or Language()
+        if first_order and ast.is_term:
+            raise ASTValidationError(ast)
+        ast.validate(first_order)
+        ast.validate_language(formula.language, language is None)
+        return formula
+
+    def print(self):
+        self.ast.print(positions=self.positions)
+
+    def compile(self, model, cache_size=None):
+        return CompiledFormula(self.ast, model, cache_size)
+
+    def profile(self, model, valuation=None, cache_size=None):
+        profile = profiling.Profile()
+        profile.value = CompiledFormula(self.ast, model, cache_size, profile=profile).value(valuation)
+        return profile
+
+    def witness(self, model, valuation=None):
+        return CompiledFormula(self.ast, model, trail=[]).witness(valuation)
+
+    def satisfying_assignments(self, model, valuation=None, cache_size=None):
+        return self.compile(model, cache_size).satisfying_assignments(valuation)
+
+    def evaluate_many(self, models, valuation=None, workers=None, chunksize=None, cache_size=None):
+        return parallel.evaluate_many(self.ast, models, valuation, workers, chunksize, cache_size)
+
+    def evaluate_valuations(self, model, valuations, workers=None, chunksize=None, cache_size=None):
+        return parallel.evaluate_valuations(self.ast, model, valuations, workers, chunksize, cache_size)
+
+    def evaluate_parallel(self, model, valuation=None, workers=None, chunksize=None, cache_size=None):
+        return parallel.evaluate_partitioned(self.ast, model, valuation, workers, chunksize, cache_size)
+
+    def is_satisfiable(self):
+        return sat.satisfiable(self.ast)
+
+    def is_valid(self):
+        return sat.valid(self.ast)
+
+    def find_model(self, max_size=None, budget=None, min_size=1):
+        if not self.first_order:
+            raise ValueError("Model search requires a first-order formula")
+        if max_size is None and budget is None:
+            max_size = modelfinder.MAX_SIZE
+        return bounded("ground", modelfinder.find_model, self.ast, self.language, max_size, budget, min_size)
+
+    def congruence(self):
+        if not self.first_order:
+            raise ValueError("Congruence closure requires a first-order formula")
+        return congruence.closure(self.ast)
+
+    def entails(self, other):
+        if not self.first_order or not other.first_order:
+            raise ValueError("Congruence closure requires first-order formulas")
+        return congruence.entails(self.ast, other.ast)
+
+    def to_bdd(self, manager=None, ordering="appearance"):
+        return bounded("build a BDD", bdd.build, self.ast, manager, ordering)
+
+    def optimize(self, model=None, universe_size=None):
+        ast = bounded("optimize", planner.optimize, self.ast, model, universe_size)
+        return Formula.from_ast(ast, self.first_order, self.language)
+
+    def explain(self, model=None, universe_size=None):
+        return bounded("explain", planner.explain, self.ast, model, universe_size)
+
+
+class CompiledFormula:
+    def __init__(self, ast, model, cache_size=None, binders=0, profile=None, trail=None):
+        self.ast = ast
+        self.model = model
+        self.free = sorted(ast.free_variables())
+        self.trail = trail
+        if trail is not None:
+            context = witness.WitnessContext(model, self.free, trail, binders)
+        elif profile is None:
+            context = CompilationContext(model, self.free, cache_size, binders)
+        else:
+            context = profiling.ProfilingContext(model, self.free, profile, cache_size, binders)
+        self.function = bounded("compile", context.condition, ast)
+        self.size = context.size
+
+    def environment(self, valuation):
+        env = [None] * self.size
+        for slot, name in enumerate(self.free):
+            if name in valuation:
+                value = valuation[name]
+            elif name in self.model.functions:
+                value = self.model.functions[name]()
+            else:
+                raise KeyError(f"Variable '{name}' does not appear in valuation or function map")
+            env[slot] = self.model.position(value)
+        return env
+
+    def value(self, valuation=None):
+        return self.call(self.environment(valuation or {}))
+
+    def call(self, env):
+        return bounded("evaluate", self.function, env)
+
+    def witness(self, valuation=None):
+        if self.trail is None:
+            raise ValueError("Formula was not compiled to record witnesses")
+        self.trail.clear()
+        return witness.Witness(self.value(valuation), self.trail)
+
+    def satisfying_assignments(self, valuation=None):
+        return witness.satisfying_assignments(self, valuation)
+
+
+class Relation:
+    def __init__(self, tuples):
+        self.tuples = frozenset(tuple(entry) for entry in tuples)
+
+    def __call__(self, *args):
+        return args in self.tuples
+
+    def __len__(self):
+        return len(self.tuples)
+
+
+class Operation:
+    def __init__(self, table):
+        self.table = MappingProxyType({tuple(args): value for args, value in table.items()})
+
+    def __reduce__(self):
+        return Operation, (dict(self.table),)
+
+    def __call__(self, *args):
+        if args not in self.table:
+            raise KeyError(f"Arguments {args} do not appear in operation table")
+        return self.table[args]
+
+    def __len__(self):
+        return len(self.table)
+
+
+def freeze(value):
+    if isinstance(value, list):
+        return tuple(freeze(entry) for entry in value)
+    return value
 
 
 class Model:
     def __init__(self, universe, functions=None, predicates=None):
-        self.universe = universe
+        universe = tuple(universe)
+        try:
+            self.universe = tuple(dict.fromkeys(universe))
+            self.index = {element: position for position, element in enumerate(self.universe)}
+            self.members = self.index.keys()
+        except TypeError:
+            self.universe = universe
+            self.index = None
+            self.members = universe
         self.functions = functions or {}
         self.predicates = predicates or {}
+        self.indexed = {}
+
+    def position(self, value):
+        if self.index is not None:
+            try:
+                return self.index[value]
+            except (KeyError, TypeError):
+                pass
+        else:
+            for position, element in enumerate(self.universe):
+                if element == value:
+                    return position
+        raise KeyError(f"Value '{value}' does not appear in universe")
+
+    def indexed_function(self, name):
+        return self.indexed_callable("function", name, self.functions[name])
+
+    def indexed_predicate(self, name):
+        return self.indexed_callable("predicate", name, self.predicates[name])
+
+    def indexed_callable(self, kind, name, function):
+        cached = self.indexed.get((kind, name))
+        if cached is None or cached[0] is not function:
+            build = self.index_function if kind == "function" else self.index_predicate
+            cached = self.indexed[kind, name] = function, build(function)
+        return cached[1]
+
+    def index_function(self, function):
+        universe, index, position = self.universe, self.index, self.position
+
+        def indexed(*args):
+            value = function(*[universe[arg] for arg in args])
+            try:
+                return index[value]
+            except (KeyError, TypeError):
+                return position(value)
+        if not isinstance(function, Operation) or index is None:
+            return indexed
+        table = {}
+        for args, value in function.table.items():
+            try:
+                table[tuple(index[arg] for arg in args)] = index[value]
+            except (KeyError, TypeError):
+                pass
+
+        def operation(*args):
+            if args in table:
+                return table[args]
+            return indexed(*args)
+        return operation
+
+    def index_predicate(self, predicate):
+        universe, index = self.universe, self.index
+        if isinstance(predicate, Relation) and index is not None:
+            tuples = frozenset(
+                tuple(index[arg] for arg in row) for row in predicate.tuples if all(arg in index for arg in row)
+            )
+            return lambda *args: args in tuples
+        return lambda *args: predicate(*[universe[arg] for arg in args])
+
+    @classmethod
+    def from_dict(cls, data):
+        universe = data["universe"]
+        universe = range(universe) if isinstance(universe, int) else [freeze(entry) for entry in universe]
+        functions = {
+            name: Operation({freeze(row[:-1]): freeze(row[-1]) for row in rows})
+            for name, rows in data.get("functions", {}).items()
+        }
+        predicates = {name: Relation(freeze(rows)) for name, rows in data.get("predicates", {}).items()}
+        return cls(universe, functions, predicates)
 
 
 class Language:
@@ -0,0 +1,190 @@
+from heapq import heappush, heappop
+from itertools import count
+from formula import Model
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTEquality, ASTInequality, ASTNot, ASTQuantifier, ASTExists,\
+    ASTVariable, ASTPredicate, ASTFunction
+
+
+class Overlay(Model):
+    def __init__(self, model):
+        self.model = model
+        self.function_updates = {}
+        self.predicate_updates = {}
+        super().__init__(
+            model.universe,
+            {name: self.lookup(self.function, name) for name in model.functions},
+            {name: self.lookup(self.predicate, name) for name in model.predicates}
+        )
+
+    @staticmethod
+    def lookup(read, name):
+        return lambda *args: read(name, args)
+
+    def function(self, name, args):
+        if (name, args) in self.function_updates:
+            return self.function_updates[name, args]
+        if name not in self.model.functions:
+            raise KeyError(f"Function '{name}' does not appear in function map")
+        return self.model.functions[name](*args)
+
+    def predicate(self, name, args):
+        if (name, args) in self.predicate_updates:
+            return self.predicate_updates[name, args]
+        if name not in self.model.predicates:
+            raise KeyError(f"Predicate '{name}' does not appear in function map")
+        return bool(self.model.predicates[name](*args))
+
+    def set_function(self, name, args, value):
+        self.function_updates[name, args] = value
+        self.functions.setdefault(name, self.lookup(self.function, name))
+
+    def set_predicate(self, name, args, value):
+        self.predicate_updates[name, args] = bool(value)
+        self.predicates.setdefault(name, self.lookup(self.predicate, name))
+
+
+class Instance:
+    __slots__ = ("node", "env", "valuation", "children", "parents", "value", "count", "reads", "height")
+
+    def __init__(self, node, env, valuation, children, height):
+        self.node = node
+        self.env = env
+        self.valuation = valuation
+        self.children = children
+        self.parents = []
+        self.value = None
+        self.count = 0
+        self.reads = ()
+        self.height = height
+
+
+class IncrementalEvaluator:
+    def __init__(self, model):
+        self.model = Overlay(model)
+        self.universe = tuple(model.universe)
+        self.instances = {}
+        self.readers = {}
+        self.order = count()
+        self.statistics = {"updates": 0, "recomputed": 0}
+
+    def add(self, ast, valuation=None):
+        valuation = valuation or {}
+        return self.build(ast, (), tuple(sorted((name, valuation[name]) for name in ast.free if name in valuation)))
+
+    def build(self, node, env, valuation):
+        key = (node, env, valuation)
+        if key in self.instances:
+            return self.instances[key]
+        if isinstance(node, (ASTPredicate, ASTEquality, ASTInequality)):
+            instance = Instance(node, env, dict(valuation), [], 0)
+            instance.value = self.atom(instance)
+        elif isinstance(node, ASTQuantifier):
+            children = [self.build(node.child, env + (entry,), valuation) for entry in self.universe]
+            instance = Instance(node, env, None, children, children[0].height + 1 if children else 1)
+            instance.count = sum(child.value for child in children)
+            instance.value = self.quantifier(instance)
+        elif isinstance(node, (ASTNot, ASTAnd, ASTOr, ASTImplication)):
+            children = [
+                self.build(child, env, tuple(entry for entry in valuation if entry[0] in child.free))
+                for child in node.children
+            ]
+            instance = Instance(node, env, None, children, max(child.height for child in children) + 1)
+            instance.value = self.connective(instance)
+        else:
+            raise ValueError(f"Cannot evaluate '{node.unparse()}' incrementally")
+        for child in instance.children:
+            child.parents.append(instance)
+        self.instances[key] = instance
+        return instance
+
+    def term(self, node, instance, reads):
+        if isinstance(node, ASTVariable):
+            if isinstance(node.token, int):
+                return instance.env[-1 - node.token]
+            if node.token in instance.valuation:
+                return instance.valuation[node.token]
+            reads.append(("function", node.token, ()))
+            return self.model.function(node.token, ())
+        if isinstance(node, ASTFunction):
+            args = tuple(self.term(child, instance, reads) for child in node.children)
+            reads.append(("function", node.token, args))
+            return self.model.function(node.token, args)
+        raise ValueError(f"Cannot evaluate '{node.unparse()}' as term")
+
+    def atom(self, instance):
+        node = instance.node
+        reads = []
+        if isinstance(node, ASTPredicate):
+            args = tuple(self.term(child, instance, reads) for child in node.children)
+            reads.append(("predicate", node.token, args))
+            value = self.model.predicate(node.token, args)
+        else:
+            value = (self.term(node.left, instance, reads) == self.term(node.right, instance, reads))\
+                == isinstance(node, ASTEquality)
+        for key in instance.reads:
+            self.readers[key].discard(instance)
+        instance.reads = tuple(set(reads))
+        for key in instance.reads:
+            self.readers.setdefault(key, set()).add(instance)
+        return value
+
+    def quantifier(self, instance):
+        if isinstance(instance.node, ASTExists):
+            return instance.count > 0
+        return instance.count == len(instance.children)
+
+    @staticmethod
+    def connective(instance):
+        node, values = instance.node, [child.value for child in instance.children]
+        if isinstance(node, ASTNot):
+            return not values[0]
+        if isinstance(node, ASTAnd):
+            return values[0] and values[1]
+        if isinstance(node, ASTOr):
+            return values[0] or values[1]
+        return not values[0] or values[1]
+
+    def set_predicate(self, name, args, value):
+        return self.update(predicates={(name, tuple(args)): value})
+
+    def set_function(self, name, args, value):
+        return self.update(functions={(name, tuple(args)): value})
+
+    def update(self, predicates=None, functions=None):
+        self.statistics["updates"] += 1
+        dirty = set()
+        for (name, args), value in (predicates or {}).items():
+            self.model.set_predicate(name, args, value)
+            dirty |= self.readers.get(("predicate", name, args), set())
+        for (name, args), value in (functions or {}).items():
+            self.model.set_function(name, args, value)
+            dirty |= self.readers.get(("function", name, args), set())
+        queue = []
+        for instance in dirty:
+            heappush(queue, (instance.height, next(self.order), instance))
+        queued = set(dirty)
+        changed = []
+        while queue:
+            _, _, instance = heappop(queue)
+            queued.discard(instance)
+            self.statistics["recomputed"] += 1
+            if isinstance(instance.node, (ASTPredicate, ASTEquality, ASTInequality)):
+                value = self.atom(instance)
+            elif isinstance(instance.node, ASTQuantifier):
+                value = self.quantifier(instance)
+            else:
+                value = self.connective(instance)
+            if value == instance.value:
+                continue
+            instance.value = value
+            changed.append(instance)
+            for parent in instance.parents:
+                if isinstance(parent.node, ASTQuantifier):
+                    parent.count += 1 if value else -1
+                if parent not in queued:
+                    queued.add(parent)
+                    heappush(queue, (parent.height, next(self.order), parent))
+        return changed
+
+    def value(self, instance):
+        return instance.value
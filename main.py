@@ -3,7 +3,7 @@ from formula import Formula, Model, Language
 
 def main():
     formula = Formula("forall x. P(x, 1, add(x, 1))", True)
-    formula.ast.print()
+    formula.print()
     model = Model(range(2), {
         "1": lambda: 1,
         "add": lambda x, y: (x + y) % 2
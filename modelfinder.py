@@ -0,0 +1,239 @@
+from itertools import count, product
+from time import monotonic, perf_counter
+import formula
+from sat import Solver
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTEquality, ASTInequality, ASTNot, ASTExists, ASTForAll,\
+    ASTVariable, ASTPredicate, ASTFunction
+
+MAX_SIZE = 8
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Grounder:
+    def __init__(self, size, deadline=None):
+        self.size = size
+        self.deadline = deadline
+        self.solver = Solver()
+        self.clauses = 0
+        self.top = self.solver.new_variable()
+        self.add_clause([self.top])
+        self.predicates = {}
+        self.rows = {}
+        self.gates = {}
+        self.encoded = {}
+
+    def add_clause(self, literals):
+        self.clauses += 1
+        self.solver.add_clause(literals)
+
+    def constant(self, value):
+        return self.top if value else -self.top
+
+    def conjoin(self, literals):
+        unique = set()
+        for literal in literals:
+            if literal == -self.top or -literal in unique:
+                return -self.top
+            if literal != self.top:
+                unique.add(literal)
+        if not unique:
+            return self.top
+        if len(unique) == 1:
+            return unique.pop()
+        key = frozenset(unique)
+        if key not in self.gates:
+            gate = self.gates[key] = self.solver.new_variable()
+            for literal in unique:
+                self.add_clause([-gate, literal])
+            self.add_clause([gate] + [-literal for literal in unique])
+        return self.gates[key]
+
+    def disjoin(self, literals):
+        return -self.conjoin(-literal for literal in literals)
+
+    def predicate(self, name, args):
+        key = (name, args)
+        if key not in self.predicates:
+            self.predicates[key] = self.solver.new_variable()
+        return self.predicates[key]
+
+    def row(self, name, args):
+        key = (name, args)
+        if key not in self.rows:
+            row = self.rows[key] = [self.solver.new_variable() for _ in range(self.size)]
+            self.add_clause(row)
+            for index, first in enumerate(row):
+                for second in row[index + 1:]:
+                    self.add_clause([-first, -second])
+        return self.rows[key]
+
+    def element(self, literals):
+        if literals.count(self.top) == 1:
+            return literals.index(self.top)
+        return None
+
+    def term(self, node, env):
+        if isinstance(node, ASTVariable):
+            if isinstance(node.token, int):
+                return [self.constant(value == env[-1 - node.token]) for value in range(self.size)]
+            return self.row(node.token, ())
+        if isinstance(node, ASTFunction):
+            arguments = [self.term(child, env) for child in node.children]
+            elements = tuple(self.element(literals) for literals in arguments)
+            if None not in elements:
+                return self.row(node.token, elements)
+            candidates = [[value for value in range(self.size) if literals[value] != -self.top]
+                          for literals in arguments]
+            cases = [
+                (self.conjoin([arguments[index][value] for index, value in enumerate(args)]),
+                 self.row(node.token, args))
+                for args in product(*candidates)
+            ]
+            return [self.disjoin(self.conjoin([case, row[value]]) for case, row in cases)
+                    for value in range(self.size)]
+        raise ValueError(f"Cannot ground '{node.unparse()}' as term")
+
+    def encode(self, node, env=()):
+        key = (node, env)
+        if key not in self.encoded:
+            self.encoded[key] = self.ground(node, env)
+        return self.encoded[key]
+
+    def ground(self, node, env):
+        if isinstance(node, ASTPredicate):
+            arguments = [self.term(child, env) for child in node.children]
+            elements = tuple(self.element(literals) for literals in arguments)
+            if None not in elements:
+                return self.predicate(node.token, elements)
+            candidates = [[value for value in range(self.size) if literals[value] != -self.top]
+                          for literals in arguments]
+            return self.disjoin(
+                self.conjoin([arguments[index][value] for index, value in enumerate(args)]
+                             + [self.predicate(node.token, args)])
+                for args in product(*candidates)
+            )
+        if isinstance(node, (ASTEquality, ASTInequality)):
+            left, right = self.term(node.left, env), self.term(node.right, env)
+            equal = self.disjoin(self.conjoin([left[value], right[value]]) for value in range(self.size))
+            return equal if isinstance(node, ASTEquality) else -equal
+        if isinstance(node, ASTNot):
+            return -self.encode(node.child, env)
+        if isinstance(node, ASTAnd):
+            return self.conjoin([self.encode(node.left, env), self.encode(node.right, env)])
+        if isinstance(node, ASTOr):
+            return self.disjoin([self.encode(node.left, env), self.encode(node.right, env)])
+        if isinstance(node, ASTImplication):
+            return self.disjoin([-self.encode(node.left, env), self.encode(node.right, env)])
+        if isinstance(node, (ASTExists, ASTForAll)):
+            if self.deadline is not None and monotonic() > self.deadline:
+                raise SearchTimeout()
+            children = [self.encode(node.child, env + (value,)) for value in range(self.size)]
+            return self.disjoin(children) if isinstance(node, ASTExists) else self.conjoin(children)
+        raise ValueError(f"Cannot ground '{node.unparse()}' as formula")
+
+    def break_symmetries(self, constants):
+        rows = [self.row(name, ()) for name in constants]
+        for index, row in enumerate(rows):
+            for value in range(index + 1, self.size):
+                self.add_clause([-row[value]])
+            for value in range(1, min(index + 1, self.size)):
+                self.add_clause([-row[value]] + [earlier[value - 1] for earlier in rows[:index]])
+
+    def model(self, predicate_arities, function_arities):
+        values = self.solver.values
+        universe = range(self.size)
+        predicates = {
+            name: formula.Relation(args for args in product(universe, repeat=arity)
+                                   if (name, args) in self.predicates and values[self.predicates[name, args]] == 1)
+            for name, arity in predicate_arities.items()
+        }
+        functions = {}
+        for name, arity in function_arities.items():
+            table = {}
+            for args in product(universe, repeat=arity):
+                row = self.rows.get((name, args))
+                table[args] = next((value for value, variable in enumerate(row) if values[variable] == 1), 0)\
+                    if row is not None else 0
+            functions[name] = formula.Operation(table)
+        return formula.Model(universe, functions, predicates)
+
+
+class Result:
+    def __init__(self, model=None, size=None, statistics=None):
+        self.model = model
+        self.size = size
+        self.statistics = statistics or []
+
+    def report(self):
+        lines = []
+        for entry in self.statistics:
+            lines.append(
+                f"size {entry['size']:<4} {entry['status']:<8} variables {entry['variables']:<8} "
+                f"clauses {entry['clauses']:<9} ground {entry['grounding']:.3f}s solve {entry['solving']:.3f}s "
+                f"decisions {entry.get('decisions', 0)} conflicts {entry.get('conflicts', 0)} "
+                f"propagations {entry.get('propagations', 0)}"
+            )
+        return "\n".join(lines)
+
+    def __bool__(self):
+        return self.model is not None
+
+
+def signature(ast, language=None):
+    predicates = dict(language.predicate_arities) if language is not None else {}
+    functions = dict(language.function_arities) if language is not None else {}
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTPredicate):
+            predicates.setdefault(node.token, node.arity)
+        elif isinstance(node, ASTFunction):
+            functions.setdefault(node.token, node.arity)
+        stack.extend(node.children)
+    for name in sorted(ast.free_variables()):
+        functions.setdefault(name, 0)
+    return predicates, functions
+
+
+def search(ast, size, predicates, functions, deadline=None):
+    entry = {"size": size, "status": "timeout", "variables": 0, "clauses": 0, "grounding": 0.0, "solving": 0.0}
+    start = perf_counter()
+    grounder = Grounder(size, deadline)
+    try:
+        grounder.break_symmetries([name for name, arity in functions.items() if arity == 0])
+        grounder.add_clause([grounder.encode(ast)])
+    except SearchTimeout:
+        entry["grounding"] = perf_counter() - start
+        return None, entry
+    entry["grounding"] = perf_counter() - start
+    entry["variables"] = grounder.solver.count
+    entry["clauses"] = grounder.clauses
+    start = perf_counter()
+    satisfiable = grounder.solver.solve(deadline)
+    entry["solving"] = perf_counter() - start
+    entry.update(grounder.solver.statistics)
+    if satisfiable is None:
+        return None, entry
+    entry["status"] = "sat" if satisfiable else "unsat"
+    return grounder.model(predicates, functions) if satisfiable else None, entry
+
+
+def find_model(ast, language=None, max_size=MAX_SIZE, budget=None, min_size=1):
+    if max_size is None and budget is None:
+        raise ValueError("Model search needs a max_size or a budget")
+    deadline = monotonic() + budget if budget is not None else None
+    predicates, functions = signature(ast, language)
+    statistics = []
+    for size in count(min_size):
+        if max_size is not None and size > max_size:
+            break
+        model, entry = search(ast, size, predicates, functions, deadline)
+        statistics.append(entry)
+        if model is not None:
+            return Result(model, size, statistics)
+        if entry["status"] == "timeout":
+            break
+    return Result(statistics=statistics)
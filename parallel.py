@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import repeat
+from multiprocessing import get_context
+import formula
+from syntax import ASTQuantifier, ASTExists
+
+CHUNKS_PER_WORKER = 4
+CANCELLATION_INTERVAL = 256
+worker = {}
+
+
+def initialize(state):
+    worker.clear()
+    worker.update(state)
+
+
+def task(function, start, stop):
+    return function(worker, start, stop)
+
+
+def check_models(state, start, stop):
+    ast, valuation, cache_size = state["ast"], state["valuation"], state["cache_size"]
+    return [
+        formula.CompiledFormula(ast, model, cache_size).value(valuation) for model in state["models"][start:stop]
+    ]
+
+
+def check_valuations(state, start, stop):
+    compiled = state["compiled"]
+    return [compiled.value(valuation) for valuation in state["valuations"][start:stop]]
+
+
+def search_partition(state, start, stop):
+    compiled, target, cancelled = state["compiled"], state["target"], state["cancelled"]
+    function = compiled.call
+    env = compiled.environment(state["valuation"])
+    slot = len(compiled.free)
+    for position in range(start, stop):
+        if (position - start) % CANCELLATION_INTERVAL == 0 and cancelled.is_set():
+            return None
+        env[slot] = position
+        if bool(function(env)) == target:
+            cancelled.set()
+            return position
+    return None
+
+
+def run(function, state, count, workers=None, chunksize=None):
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, -(-count // (workers * CHUNKS_PER_WORKER)))
+    starts = range(0, count, chunksize)
+    stops = [min(start + chunksize, count) for start in starts]
+    if workers == 1 or len(starts) == 1:
+        for start, stop in zip(starts, stops):
+            yield from function(state, start, stop)
+        return
+    executor = ProcessPoolExecutor(
+        min(workers, len(starts)), mp_context=get_context("fork"), initializer=initialize, initargs=(state,)
+    )
+    try:
+        for results in executor.map(task, repeat(function), starts, stops):
+            yield from results
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def evaluate_many(ast, models, valuation=None, workers=None, chunksize=None, cache_size=None):
+    models = models if isinstance(models, (list, tuple)) else list(models)
+    state = {"ast": ast, "models": models, "valuation": valuation or {}, "cache_size": cache_size}
+    return run(check_models, state, len(models), workers, chunksize)
+
+
+def evaluate_valuations(ast, model, valuations, workers=None, chunksize=None, cache_size=None):
+    valuations = valuations if isinstance(valuations, (list, tuple)) else list(valuations)
+    state = {"compiled": formula.CompiledFormula(ast, model, cache_size), "valuations": valuations}
+    return run(check_valuations, state, len(valuations), workers, chunksize)
+
+
+def evaluate_partitioned(ast, model, valuation=None, workers=None, chunksize=None, cache_size=None):
+    valuation = valuation or {}
+    if not isinstance(ast, ASTQuantifier):
+        return formula.CompiledFormula(ast, model, cache_size).value(valuation)
+    context = get_context("fork")
+    universe = model.universe
+    target = isinstance(ast, ASTExists)
+    state = {
+        "compiled": formula.CompiledFormula(ast.child, model, cache_size, 1),
+        "valuation": valuation,
+        "target": target,
+        "cancelled": context.Event()
+    }
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, -(-len(universe) // (workers * CHUNKS_PER_WORKER)))
+    if workers == 1 or len(universe) <= chunksize:
+        found = search_partition(state, 0, len(universe))
+        return target if found is not None else not target
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=initialize, initargs=(state,))
+    try:
+        pending = {
+            executor.submit(task, search_partition, start, min(start + chunksize, len(universe)))
+            for start in range(0, len(universe), chunksize)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            if any(future.result() is not None for future in done):
+                state["cancelled"].set()
+                return target
+        return not target
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
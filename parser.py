@@ -1,5 +1,6 @@
+from array import array
 from tokenizer import tokenize
-from ast import *
+from syntax import *
 from string import ascii_lowercase, ascii_uppercase, digits
 
 
@@ -14,17 +15,62 @@ class ParsingError(Exception):
 
 
 class Parser:
-    def __init__(self, string):
+    def __init__(self, string, first_order=None, language=None, fill_in=False):
         self.string = string
         self.tokens = tokenize(string)
+        self.first_order = first_order
+        self.language = language
+        self.fill_in = fill_in
+        self.scope = []
+        self.bindings = {}
+        self.node = None
+        self.token = None
+        self.positions = array("q")
+        self.stack = []
         self.function = lambda identifier: all(c in ascii_lowercase + digits for c in identifier)
         self.predicate = lambda identifier: all(c in ascii_uppercase for c in identifier)
 
     def parse(self):
-        ast = self.parse_quantifier()
+        self.node = None
+        self.positions = array("q")
+        self.stack = []
+        self.push(self.parse_quantifier)
+        pop = self.stack.pop
+        while self.stack:
+            state, args = pop()
+            state(*args)
         if not self.tokens.peek().is_symbol("EOF"):
             raise ParsingError(self.string, self.tokens.peek(), f"Unexpected token: {self.tokens.peek()}")
-        return ast
+        return self.node
+
+    def push(self, state, *args):
+        self.stack.append((state, args))
+
+    def build(self, node, token):
+        self.token = token
+        self.positions.append(token.part)
+        try:
+            if self.first_order is not None:
+                node.check(self.first_order)
+        except ASTValidationError as error:
+            raise ASTValidationError(error.node, token) from None
+        if self.language is not None:
+            node.check_language(self.language, self.fill_in)
+        return node
+
+    def variable(self, identifier):
+        node = ASTVariable(identifier)
+        if self.bindings.get(identifier.data):
+            reference = len(self.scope) - 1 - self.bindings[identifier.data][-1]
+            return node.substitute_references(identifier, reference)
+        return node
+
+    def bind(self, name):
+        self.bindings.setdefault(name, []).append(len(self.scope))
+        self.scope.append(name)
+
+    def unbind(self):
+        self.bindings[self.scope.pop()].pop()
 
     def expect_identifier(self):
         if not self.tokens.peek().is_identifier():
@@ -43,91 +89,115 @@ class Parser:
 
     def parse_term(self):
         if self.tokens.peek().is_symbol("("):
-            return self.parse_bracketed_formula()
-        if self.tokens.peek().is_identifier():
+            self.tokens.discard()
+            self.push(self.expect_symbol, ")")
+            self.push(self.parse_quantifier)
+        elif self.tokens.peek().is_identifier():
             identifier = self.tokens.get()
-            if self.tokens.peek().is_symbol("("):
+            if not self.tokens.peek().is_symbol("("):
+                self.node = self.build(self.variable(identifier), identifier)
+            elif self.tokens.peek(1).is_symbol(")"):
+                self.tokens.discard()
+                self.build_call(identifier, [])
+            else:
                 self.tokens.discard()
-                args = self.parse_args_list()
-                if self.function(identifier.data):
-                    node = ASTFunction(identifier, args)
-                elif self.predicate(identifier.data):
-                    node = ASTPredicate(identifier, args)
-                else:
-                    raise ParsingError(
-                        self.string, identifier,
-                        f"Identifier '{identifier.data}' does not match function or predicate map",
-                    )
-                self.expect_symbol(")")
-                return node
-            return ASTVariable(identifier)
-        if self.tokens.peek().is_symbol("~"):
-            return self.parse_unary()
-        raise ParsingError(self.string, self.tokens.peek(), f"Expected term, got {self.tokens.peek()}")
-
-    def parse_unary(self):
-        if self.tokens.peek().is_symbol("~"):
-            symbol = self.tokens.get()
-            return ASTNot(symbol, self.parse_term())
-        return self.parse_term()
+                self.push(self.parse_args_list, identifier, [])
+                self.push(self.parse_term)
+        elif self.tokens.peek().is_symbol("~"):
+            self.push(self.build_unary, self.tokens.get())
+            self.push(self.parse_term)
+        else:
+            raise ParsingError(self.string, self.tokens.peek(), f"Expected term, got {self.tokens.peek()}")
+
+    def build_call(self, identifier, args):
+        if self.function(identifier.data):
+            node = self.build(ASTFunction(identifier, args), identifier)
+        elif self.predicate(identifier.data):
+            node = self.build(ASTPredicate(identifier, args), identifier)
+        else:
+            raise ParsingError(
+                self.string, identifier,
+                f"Identifier '{identifier.data}' does not match function or predicate map",
+            )
+        self.expect_symbol(")")
+        self.node = node
+
+    def parse_args_list(self, identifier, args):
+        args.append(self.node)
+        if self.tokens.peek().is_symbol(","):
+            self.tokens.discard()
+            self.push(self.parse_args_list, identifier, args)
+            self.push(self.parse_term)
+        else:
+            self.build_call(identifier, args)
+
+    def build_unary(self, symbol):
+        self.node = self.build(ASTNot(symbol, self.node), symbol)
 
     def parse_equality(self):
-        node = self.parse_term()
-        if self.tokens.peek().is_symbol("==", "!="):
-            symbol = self.tokens.get()
-            if symbol.is_symbol("=="):
-                return ASTEquality(symbol, node, self.parse_term())
-            return ASTInequality(symbol, node, self.parse_term())
-        return node
+        self.push(self.parse_equality_operator)
+        self.push(self.parse_term)
 
-    def parse_args_list(self):
-        args = []
-        if self.tokens.peek().is_symbol(")"):
-            return args
-        args.append(self.parse_term())
-        while self.tokens.peek().is_symbol(","):
-            self.tokens.discard()
-            args.append(self.parse_term())
-        return args
+    def parse_equality_operator(self):
+        if self.tokens.peek().is_symbol("==", "!="):
+            self.push(self.build_equality, self.node, self.tokens.get())
+            self.push(self.parse_term)
 
-    def parse_bracketed_formula(self):
-        self.expect_symbol("(")
-        ast = self.parse_quantifier()
-        self.expect_symbol(")")
-        return ast
+    def build_equality(self, left, symbol):
+        if symbol.is_symbol("=="):
+            self.node = self.build(ASTEquality(symbol, left, self.node), symbol)
+        else:
+            self.node = self.build(ASTInequality(symbol, left, self.node), symbol)
 
     def parse_quantifier(self):
         if not self.tokens.peek().is_symbol("forall", "exists"):
-            return self.parse_implication()
+            self.push(self.parse_implication)
+            return
         symbol = self.tokens.get()
         identifier = self.expect_identifier()
         self.expect_symbol(".")
+        self.bind(identifier.data)
+        self.push(self.build_quantifier, symbol, identifier)
+        self.push(self.parse_quantifier)
+
+    def build_quantifier(self, symbol, identifier):
+        self.unbind()
         if symbol.is_symbol("exists"):
-            return ASTExists(symbol, identifier, self.parse_quantifier())
-        return ASTForAll(symbol, identifier, self.parse_quantifier())
+            self.node = self.build(ASTExists(symbol, identifier, self.node, False), symbol)
+        else:
+            self.node = self.build(ASTForAll(symbol, identifier, self.node, False), symbol)
 
     def parse_implication(self):
-        node = self.parse_and_or()
-        while self.tokens.peek().is_symbol("->"):
-            symbol = self.tokens.get()
-            right = self.parse_implication()
-            node = ASTImplication(symbol, node, right)
-        return node
+        self.push(self.parse_implication_operator)
+        self.push(self.parse_and_or)
+
+    def parse_implication_operator(self):
+        if self.tokens.peek().is_symbol("->"):
+            self.push(self.build_implication, self.node, self.tokens.get())
+            self.push(self.parse_implication)
+
+    def build_implication(self, left, symbol):
+        self.node = self.build(ASTImplication(symbol, left, self.node), symbol)
+        self.parse_implication_operator()
 
     def parse_and_or(self):
-        node = self.parse_equality()
-        found_and = found_or = False
-        while self.tokens.peek().is_symbol("^", "v"):
-            symbol = self.tokens.get()
-            right = self.parse_term()
-            if symbol.is_symbol("v"):
-                found_or = True
-                node = ASTOr(symbol, node, right)
-            else:
-                found_and = True
-                node = ASTAnd(symbol, node, right)
-            if found_and and found_or:
-                raise ParsingError(
-                    self.string, symbol, f"Operators 'and' and 'or' should be explicitly grouped",
-                )
-        return node
+        self.push(self.parse_and_or_operator, False, False)
+        self.push(self.parse_equality)
+
+    def parse_and_or_operator(self, found_and, found_or):
+        if self.tokens.peek().is_symbol("^", "v"):
+            self.push(self.build_and_or, self.node, self.tokens.get(), found_and, found_or)
+            self.push(self.parse_term)
+
+    def build_and_or(self, left, symbol, found_and, found_or):
+        if symbol.is_symbol("v"):
+            found_or = True
+            self.node = self.build(ASTOr(symbol, left, self.node), symbol)
+        else:
+            found_and = True
+            self.node = self.build(ASTAnd(symbol, left, self.node), symbol)
+        if found_and and found_or:
+            raise ParsingError(
+                self.string, symbol, f"Operators 'and' and 'or' should be explicitly grouped",
+            )
+        self.parse_and_or_operator(found_and, found_or)
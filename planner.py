@@ -0,0 +1,180 @@
+from random import Random
+from tokenizer import Token
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTEquality, ASTInequality, ASTNot, ASTQuantifier, ASTExists,\
+    ASTForAll, ASTVariable, ASTPredicate
+
+DEFAULT_UNIVERSE_SIZE = 10
+SAMPLES = 64
+
+
+def shift(node, amount, cutoff=0):
+    if isinstance(node, ASTVariable):
+        if isinstance(node.token, int) and node.token >= cutoff:
+            return ASTVariable(node.dereferenced, node.token + amount)
+        return node
+    offset = 1 if isinstance(node, ASTQuantifier) else 0
+    children = [shift(child, amount, cutoff + offset) for child in node.children]
+    if all(new is old for new, old in zip(children, node.children)):
+        return node
+    return node.rebuild(children)
+
+
+def occurs(node, reference):
+    if isinstance(node, ASTVariable):
+        return isinstance(node.token, int) and node.token == reference
+    if isinstance(node, ASTQuantifier):
+        return occurs(node.child, reference + 1)
+    return any(occurs(child, reference) for child in node.children)
+
+
+def dual(quantifier):
+    if isinstance(quantifier, ASTForAll):
+        return ASTExists(Token("sym", "exists", "exists", -1), quantifier.identifier, quantifier.child, False)
+    return ASTForAll(Token("sym", "forall", "forall", -1), quantifier.identifier, quantifier.child, False)
+
+
+def quantify(quantifier, body):
+    return type(quantifier)(quantifier.data, quantifier.identifier, body, False)
+
+
+def push(quantifier, body):
+    if not occurs(body, 0):
+        return shift(body, -1)
+    if isinstance(body, (ASTAnd, ASTOr)):
+        if isinstance(body, ASTAnd) == isinstance(quantifier, ASTForAll):
+            return body.rebuild([push(quantifier, body.left), push(quantifier, body.right)])
+        if not occurs(body.left, 0):
+            return body.rebuild([shift(body.left, -1), push(quantifier, body.right)])
+        if not occurs(body.right, 0):
+            return body.rebuild([push(quantifier, body.left), shift(body.right, -1)])
+    if isinstance(body, ASTImplication):
+        if not occurs(body.left, 0):
+            return body.rebuild([shift(body.left, -1), push(quantifier, body.right)])
+        if not occurs(body.right, 0):
+            return body.rebuild([push(dual(quantifier), body.left), shift(body.right, -1)])
+    if isinstance(body, ASTNot):
+        child = push(dual(quantifier), body.child)
+        if not isinstance(child, ASTQuantifier) or child.child is not body.child:
+            return ASTNot(body.data, child)
+    return quantify(quantifier, body)
+
+
+def miniscope(node):
+    if isinstance(node, ASTQuantifier):
+        return push(node, miniscope(node.child))
+    if node.is_term or not node.children:
+        return node
+    children = [miniscope(child) for child in node.children]
+    if all(new is old for new, old in zip(children, node.children)):
+        return node
+    return node.rebuild(children)
+
+
+class Estimator:
+    def __init__(self, model=None, universe_size=None):
+        self.model = model
+        if universe_size is None:
+            universe_size = len(model.universe) if model is not None else DEFAULT_UNIVERSE_SIZE
+        self.size = max(universe_size, 1)
+        self.random = Random(0)
+        self.selectivities = {}
+
+    def selectivity(self, node):
+        if isinstance(node, ASTPredicate):
+            return self.predicate_selectivity(node.token, node.arity)
+        if isinstance(node, ASTEquality):
+            return 1 / self.size
+        if isinstance(node, ASTInequality):
+            return 1 - 1 / self.size
+        if isinstance(node, ASTNot):
+            return 1 - self.selectivity(node.child)
+        if isinstance(node, ASTAnd):
+            return self.selectivity(node.left) * self.selectivity(node.right)
+        if isinstance(node, ASTOr):
+            return 1 - (1 - self.selectivity(node.left)) * (1 - self.selectivity(node.right))
+        if isinstance(node, ASTImplication):
+            return 1 - self.selectivity(node.left) * (1 - self.selectivity(node.right))
+        if isinstance(node, ASTExists):
+            return 1 - (1 - self.selectivity(node.child)) ** self.size
+        if isinstance(node, ASTForAll):
+            return self.selectivity(node.child) ** self.size
+        return 0.5
+
+    def predicate_selectivity(self, name, arity):
+        if self.model is None or name not in self.model.predicates:
+            return 0.5
+        if name not in self.selectivities:
+            universe = list(self.model.universe)
+            predicate = self.model.predicates[name]
+            hits = sum(bool(predicate(*(self.random.choice(universe) for _ in range(arity))))
+                       for _ in range(SAMPLES))
+            self.selectivities[name] = (hits + 1) / (SAMPLES + 2)
+        return self.selectivities[name]
+
+    def cost(self, node):
+        if isinstance(node, ASTQuantifier):
+            return self.size * self.cost(node.child)
+        if isinstance(node, ASTAnd):
+            return self.cost(node.left) + self.selectivity(node.left) * self.cost(node.right)
+        if isinstance(node, ASTOr):
+            return self.cost(node.left) + (1 - self.selectivity(node.left)) * self.cost(node.right)
+        if isinstance(node, ASTImplication):
+            return self.cost(node.left) + self.selectivity(node.left) * self.cost(node.right)
+        return 1 + sum(self.cost(child) for child in node.children)
+
+    def rank(self, node, connective):
+        if connective is ASTAnd:
+            return self.cost(node) / max(1 - self.selectivity(node), 1e-9)
+        return self.cost(node) / max(self.selectivity(node), 1e-9)
+
+
+def operands(node, connective):
+    if isinstance(node, connective):
+        return operands(node.left, connective) + operands(node.right, connective)
+    return [node]
+
+
+def reorder(node, estimator):
+    if node.is_term or not node.children:
+        return node
+    if isinstance(node, (ASTAnd, ASTOr)):
+        connective = type(node)
+        unique = dict.fromkeys(reorder(child, estimator) for child in operands(node, connective))
+        nodes = sorted(unique, key=lambda child: estimator.rank(child, connective))
+        result = nodes[0]
+        for child in nodes[1:]:
+            result = connective(node.data, result, child)
+        return result
+    children = [reorder(child, estimator) for child in node.children]
+    if all(new is old for new, old in zip(children, node.children)):
+        return node
+    return node.rebuild(children)
+
+
+def optimize(ast, model=None, universe_size=None):
+    return reorder(miniscope(ast), Estimator(model, universe_size))
+
+
+def explain(ast, model=None, universe_size=None):
+    estimator = Estimator(model, universe_size)
+    optimized = reorder(miniscope(ast), estimator)
+    lines = [
+        f"original:  {ast.unparse()}",
+        f"           estimated cost {estimator.cost(ast):.4g} at universe size {estimator.size}",
+        f"optimized: {optimized.unparse()}",
+        f"           estimated cost {estimator.cost(optimized):.4g} at universe size {estimator.size}",
+    ]
+    for connective in (ASTAnd, ASTOr):
+        for node in conjunctions(optimized, connective):
+            lines.append(f"  {node.data.data} order:")
+            for child in operands(node, connective):
+                lines.append(f"    cost {estimator.cost(child):<10.4g} selectivity {estimator.selectivity(child):<8.3g}"
+                             f" {child.unparse()}")
+    return "\n".join(lines)
+
+
+def conjunctions(node, connective, inside=False):
+    if isinstance(node, connective):
+        found = [] if inside else [node]
+        return found + conjunctions(node.left, connective, True) + conjunctions(node.right, connective, True)
+    return [found for child in node.children for found in conjunctions(child, connective)]
@@ -0,0 +1,121 @@
+from time import perf_counter
+from syntax import CompilationContext, ASTAnd, ASTOr, ASTImplication
+
+WIDTH = 72
+
+
+class Site:
+    __slots__ = ("node", "depth", "children", "count", "time")
+
+    def __init__(self, node, depth):
+        self.node = node
+        self.depth = depth
+        self.children = []
+        self.count = 0
+        self.time = 0.0
+
+    @property
+    def self_time(self):
+        return self.time - sum(child.time for child in self.children)
+
+    @property
+    def short_circuit_rate(self):
+        if not isinstance(self.node, (ASTAnd, ASTOr, ASTImplication)) or len(self.children) != 2:
+            return None
+        left, right = self.children
+        if not left.count:
+            return None
+        return 1 - right.count / left.count
+
+
+class Callable:
+    __slots__ = ("kind", "name", "count", "time")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.count = 0
+        self.time = 0.0
+
+
+class Profile:
+    def __init__(self):
+        self.roots = []
+        self.callables = {}
+        self.value = None
+
+    def sites(self):
+        stack = list(reversed(self.roots))
+        while stack:
+            site = stack.pop()
+            yield site
+            stack.extend(reversed(site.children))
+
+    def callable(self, kind, name, function):
+        if (kind, name) not in self.callables:
+            self.callables[kind, name] = Callable(kind, name)
+        stats = self.callables[kind, name]
+
+        def profiled(*args):
+            stats.count += 1
+            start = perf_counter()
+            try:
+                return function(*args)
+            finally:
+                stats.time += perf_counter() - start
+        return profiled
+
+    @staticmethod
+    def describe(site, indent=False):
+        rate = site.short_circuit_rate
+        rate = f"{rate:>6.1%}" if rate is not None else " " * 6
+        text = ("  " * site.depth if indent else "") + site.node.unparse()
+        if len(text) > WIDTH:
+            text = text[:WIDTH - 3] + "..."
+        return f"{site.count:>10} {site.time:>10.6f} {site.self_time:>10.6f} {rate}  {text}"
+
+    def report(self, limit=20):
+        header = f"{'calls':>10} {'total s':>10} {'self s':>10} {'short':>6}  subformula"
+        sites = sorted(self.sites(), key=lambda site: site.self_time, reverse=True)[:limit]
+        lines = ["hot subformulas (by self time):", header]
+        lines.extend(self.describe(site) for site in sites)
+        if self.callables:
+            lines.append("")
+            lines.append("model callables:")
+            lines.append(f"{'calls':>10} {'total s':>10}  symbol")
+            for stats in sorted(self.callables.values(), key=lambda stats: stats.time, reverse=True):
+                lines.append(f"{stats.count:>10} {stats.time:>10.6f}  {stats.kind} {stats.name}")
+        return "\n".join(lines)
+
+    def tree(self):
+        header = f"{'calls':>10} {'total s':>10} {'self s':>10} {'short':>6}  subformula"
+        return "\n".join([header] + [self.describe(site, True) for site in self.sites()])
+
+
+class ProfilingContext(CompilationContext):
+    def __init__(self, model, free, profile, cache_size=None, binders=0):
+        super().__init__(model, free, cache_size, binders)
+        self.profile = profile
+        self.sites = []
+
+    def compile(self, node):
+        site = Site(node, len(self.sites))
+        (self.sites[-1].children if self.sites else self.profile.roots).append(site)
+        self.sites.append(site)
+        function = super().compile(node)
+        self.sites.pop()
+
+        def profiled(env):
+            site.count += 1
+            start = perf_counter()
+            try:
+                return function(env)
+            finally:
+                site.time += perf_counter() - start
+        return profiled
+
+    def function(self, name):
+        return self.profile.callable("function", name, super().function(name))
+
+    def predicate(self, name):
+        return self.profile.callable("predicate", name, super().predicate(name))
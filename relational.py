@@ -0,0 +1,352 @@
+from itertools import product
+from formula import Relation
+from tokenizer import Token
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTEquality, ASTInequality, ASTNot, ASTQuantifier, ASTExists,\
+    ASTVariable, ASTPredicate, ASTFunction
+
+
+class Table:
+    def __init__(self, columns, rows):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    def positions(self, columns):
+        return [self.columns.index(column) for column in columns]
+
+    def assignments(self):
+        for row in self.rows:
+            yield dict(zip(self.columns, row))
+
+    def __contains__(self, assignment):
+        return tuple(assignment[column] for column in self.columns) in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def key(row, positions):
+    return tuple(row[position] for position in positions)
+
+
+class Plan:
+    def __init__(self, columns, *children):
+        self.columns = tuple(columns)
+        self.children = children
+
+    def execute(self, engine):
+        pass
+
+    def describe(self):
+        return type(self).__name__
+
+    def explain(self, indent=0):
+        lines = [indent * "  " + f"{self.describe()} -> ({', '.join(map(column_name, self.columns))})"]
+        for child in self.children:
+            lines.append(child.explain(indent + 1))
+        return "\n".join(lines)
+
+
+class Scan(Plan):
+    def __init__(self, predicate, arguments):
+        super().__init__(dict.fromkeys(argument for kind, argument in arguments if kind == "column"))
+        self.predicate = predicate
+        self.arguments = arguments
+
+    def execute(self, engine):
+        first = {}
+        constants = []
+        for position, (kind, argument) in enumerate(self.arguments):
+            if kind == "column":
+                first.setdefault(argument, position)
+            else:
+                constants.append((position, argument))
+        repeated = [(position, first[argument]) for position, (kind, argument) in enumerate(self.arguments)
+                    if kind == "column" and first[argument] != position]
+        positions = [first[column] for column in self.columns]
+        rows = set()
+        for row in engine.extension(self.predicate, len(self.arguments)):
+            if all(row[position] == value for position, value in constants)\
+                    and all(row[position] == row[other] for position, other in repeated):
+                rows.add(key(row, positions))
+        return Table(self.columns, rows)
+
+    def describe(self):
+        return f"Scan {self.predicate}"
+
+
+class Domain(Plan):
+    def execute(self, engine):
+        return Table(self.columns, set(product(engine.universe, repeat=len(self.columns))))
+
+    def describe(self):
+        return "Domain"
+
+
+class Select(Plan):
+    def __init__(self, child, node, scope):
+        super().__init__(child.columns, child)
+        self.node = node
+        self.scope = scope
+
+    def execute(self, engine):
+        table = self.children[0].execute(engine)
+        test = engine.condition(self.node, self.scope, table.columns)
+        return Table(table.columns, {row for row in table.rows if test(row)})
+
+    def describe(self):
+        return f"Select {self.node.unparse()}"
+
+
+class Project(Plan):
+    def __init__(self, child, columns):
+        super().__init__(columns, child)
+
+    def execute(self, engine):
+        table = self.children[0].execute(engine)
+        positions = table.positions(self.columns)
+        return Table(self.columns, {key(row, positions) for row in table.rows})
+
+
+class Join(Plan):
+    def __init__(self, left, right):
+        super().__init__(dict.fromkeys(left.columns + right.columns), left, right)
+
+    def execute(self, engine):
+        left, right = (child.execute(engine) for child in self.children)
+        common = [column for column in left.columns if column in right.columns]
+        extra = [column for column in right.columns if column not in left.columns]
+        build, probe = (left, right) if len(left) <= len(right) else (right, left)
+        index = {}
+        build_positions, probe_positions = build.positions(common), probe.positions(common)
+        for row in build.rows:
+            index.setdefault(key(row, build_positions), []).append(row)
+        rows = set()
+        extra_positions = right.positions(extra)
+        for row in probe.rows:
+            for match in index.get(key(row, probe_positions), ()):
+                left_row, right_row = (match, row) if build is left else (row, match)
+                rows.add(left_row + key(right_row, extra_positions))
+        return Table(left.columns + tuple(extra), rows)
+
+    def describe(self):
+        return "HashJoin"
+
+
+class AntiJoin(Plan):
+    def __init__(self, left, right):
+        super().__init__(left.columns, left, right)
+
+    def execute(self, engine):
+        left, right = (child.execute(engine) for child in self.children)
+        index = {key(row, right.positions(right.columns)) for row in right.rows}
+        positions = left.positions(right.columns)
+        return Table(left.columns, {row for row in left.rows if key(row, positions) not in index})
+
+    def describe(self):
+        return "HashAntiJoin"
+
+
+class Union(Plan):
+    def __init__(self, left, right):
+        super().__init__(left.columns, left, right)
+
+    def execute(self, engine):
+        left, right = (child.execute(engine) for child in self.children)
+        positions = right.positions(left.columns)
+        return Table(left.columns, left.rows | {key(row, positions) for row in right.rows})
+
+
+class Division(Plan):
+    def __init__(self, child, column):
+        super().__init__([other for other in child.columns if other != column], child)
+        self.column = column
+
+    def execute(self, engine):
+        table = self.children[0].execute(engine)
+        positions = table.positions(self.columns)
+        groups = {}
+        for row in table.rows:
+            groups.setdefault(key(row, positions), set()).add(row[table.columns.index(self.column)])
+        size = len(engine.members)
+        return Table(self.columns, {group for group, values in groups.items() if len(values & engine.members) == size})
+
+    def describe(self):
+        return f"Division by Domain {column_name(self.column)}"
+
+
+def column_name(column):
+    if isinstance(column, tuple):
+        return f"{column[1]}#{column[0]}"
+    return column
+
+
+class RelationalEngine:
+    def __init__(self, model):
+        self.model = model
+        self.universe = tuple(model.universe)
+        self.members = frozenset(self.universe)
+        self.extensions = {}
+
+    def extension(self, name, arity):
+        if name not in self.model.predicates:
+            raise KeyError(f"Predicate '{name}' does not appear in function map")
+        if name not in self.extensions:
+            predicate = self.model.predicates[name]
+            if isinstance(predicate, Relation):
+                self.extensions[name] = predicate.tuples
+            else:
+                self.extensions[name] = [row for row in product(self.universe, repeat=arity) if predicate(*row)]
+        return self.extensions[name]
+
+    def constant(self, node):
+        if isinstance(node, ASTVariable):
+            return not isinstance(node.token, int) and node.token in self.model.functions
+        return isinstance(node, ASTFunction) and not node.children
+
+    def columns(self, node, scope):
+        if isinstance(node, ASTVariable):
+            if isinstance(node.token, int):
+                return {scope[-1 - node.token]: None}
+            if self.constant(node):
+                return {}
+            return {node.token: None}
+        if isinstance(node, ASTQuantifier):
+            bound = (len(scope), node.identifier.data)
+            columns = self.columns(node.child, scope + [bound])
+            columns.pop(bound, None)
+            return columns
+        columns = {}
+        for child in node.children:
+            columns.update(self.columns(child, scope))
+        return columns
+
+    def term(self, node, scope, columns):
+        if isinstance(node, ASTVariable) and not self.constant(node):
+            position = columns.index(scope[-1 - node.token] if isinstance(node.token, int) else node.token)
+            return lambda row: row[position]
+        if node.token not in self.model.functions:
+            raise KeyError(f"Function '{node.token}' does not appear in function map")
+        function = self.model.functions[node.token]
+        arguments = [self.term(child, scope, columns) for child in node.children]
+
+        def apply(row):
+            value = function(*(argument(row) for argument in arguments))
+            if value not in self.members:
+                raise KeyError(f"Value '{value}' does not appear in universe")
+            return value
+        return apply
+
+    def condition(self, node, scope, columns):
+        if isinstance(node, (ASTEquality, ASTInequality)):
+            left, right = self.term(node.left, scope, columns), self.term(node.right, scope, columns)
+            if isinstance(node, ASTEquality):
+                return lambda row: left(row) == right(row)
+            return lambda row: left(row) != right(row)
+        if isinstance(node, ASTPredicate):
+            predicate = self.model.predicates[node.token]
+            arguments = [self.term(child, scope, columns) for child in node.children]
+            return lambda row: predicate(*(argument(row) for argument in arguments))
+        raise ValueError(f"Cannot select on '{node.unparse()}'")
+
+    def pad(self, plan, columns):
+        missing = [column for column in columns if column not in plan.columns]
+        if missing:
+            return Join(plan, Domain(missing))
+        return plan
+
+    def complement(self, plan):
+        return AntiJoin(Domain(plan.columns), plan)
+
+    def plan(self, node, scope=None):
+        scope = scope or []
+        if isinstance(node, ASTPredicate):
+            return self.plan_predicate(node, scope)
+        if isinstance(node, (ASTEquality, ASTInequality)):
+            return Select(Domain(self.columns(node, scope)), node, scope)
+        if isinstance(node, ASTNot):
+            return self.complement(self.plan(node.child, scope))
+        if isinstance(node, ASTAnd):
+            return self.plan_conjunction(conjuncts(node), scope)
+        if isinstance(node, ASTOr):
+            left, right = self.plan(node.left, scope), self.plan(node.right, scope)
+            columns = dict.fromkeys(left.columns + right.columns)
+            return Union(self.pad(left, columns), self.pad(right, columns))
+        if isinstance(node, ASTImplication):
+            return self.complement(self.plan_conjunction([node.left, negate(node.right)], scope))
+        if isinstance(node, ASTQuantifier):
+            return self.plan_quantifier(node, scope)
+        raise ValueError(f"Cannot plan '{node.unparse()}'")
+
+    def plan_predicate(self, node, scope):
+        arguments = []
+        compound = []
+        for position, child in enumerate(node.children):
+            if isinstance(child, ASTVariable) and not self.constant(child):
+                arguments.append(("column", next(iter(self.columns(child, scope)))))
+            elif self.constant(child):
+                arguments.append(("value", self.term(child, scope, ())(())))
+            else:
+                arguments.append(("column", ("#", position)))
+                compound.append(position)
+        if not compound:
+            return Scan(node.token, arguments)
+        plan = self.pad(Scan(node.token, arguments), self.columns(node, scope))
+        return Project(Select(plan, node, scope), self.columns(node, scope))
+
+    def plan_conjunction(self, nodes, scope):
+        filters = [node for node in nodes if isinstance(node, (ASTNot, ASTEquality, ASTInequality))]
+        plan = None
+        for node in nodes:
+            if not isinstance(node, (ASTNot, ASTEquality, ASTInequality)):
+                child = self.plan(node, scope)
+                plan = child if plan is None else Join(plan, child)
+        for node in filters:
+            columns = self.columns(node, scope)
+            if plan is not None and all(column in plan.columns for column in columns):
+                if isinstance(node, ASTNot):
+                    plan = AntiJoin(plan, self.plan(node.child, scope))
+                else:
+                    plan = Select(plan, node, scope)
+            else:
+                child = self.plan(node, scope)
+                plan = child if plan is None else Join(plan, child)
+        return plan
+
+    def plan_quantifier(self, node, scope):
+        bound = (len(scope), node.identifier.data)
+        inner = scope + [bound]
+        columns = [column for column in self.columns(node.child, inner) if column != bound]
+        if isinstance(node, ASTExists):
+            return Project(self.plan(node.child, inner), columns)
+        if isinstance(node.child, ASTImplication):
+            counterexamples = self.plan_conjunction([node.child.left, negate(node.child.right)], inner)
+        elif isinstance(node.child, ASTNot):
+            counterexamples = self.plan(node.child.child, inner)
+        else:
+            return Division(self.pad(self.plan(node.child, inner), [bound]), bound)
+        return self.complement(Project(counterexamples, columns))
+
+
+def negate(node):
+    return ASTNot(Token("sym", "~", "~", -1), node)
+
+
+def conjuncts(node):
+    if isinstance(node, ASTAnd):
+        return conjuncts(node.left) + conjuncts(node.right)
+    return [node]
+
+
+def plan(ast, model):
+    engine = RelationalEngine(model)
+    return engine, engine.plan(ast)
+
+
+def query(ast, model):
+    engine, root = plan(ast, model)
+    return Project(root, sorted(root.columns)).execute(engine)
+
+
+def holds(ast, model, valuation=None):
+    table = query(ast, model)
+    return (valuation or {}) in table if table.columns else bool(table.rows)
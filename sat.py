@@ -0,0 +1,351 @@
+from heapq import heapify, heappush, heappop
+from time import monotonic
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTNot, ASTVariable
+
+RESTART_BASE = 100
+ACTIVITY_DECAY = 0.95
+DEADLINE_INTERVAL = 256
+REDUCE_BASE = 2000
+REDUCE_STEP = 300
+GLUE = 2
+HEAP_SLACK = 4
+
+
+class Tseitin:
+    def __init__(self, solver=None):
+        self.solver = solver or Solver()
+        self.variables = {}
+        self.gates = {}
+
+    def variable(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_variable()
+        return self.variables[name]
+
+    def encode(self, node):
+        literals = {}
+        stack = [(node, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current in literals:
+                continue
+            if isinstance(current, ASTVariable):
+                if isinstance(current.token, int):
+                    raise ValueError(f"Cannot encode bound variable '{current.unparse()}'")
+                literals[current] = self.variable(current.token)
+            elif not isinstance(current, (ASTNot, ASTAnd, ASTOr, ASTImplication)):
+                raise ValueError(f"Cannot encode '{current.unparse()}' as propositional formula")
+            elif current in self.gates:
+                literals[current] = self.gates[current]
+            elif not expanded:
+                stack.append((current, True))
+                stack.extend((child, False) for child in reversed(current.children))
+            elif isinstance(current, ASTNot):
+                literals[current] = -literals[current.child]
+            else:
+                literals[current] = self.gate(current, literals[current.left], literals[current.right])
+        return literals[node]
+
+    def gate(self, node, left, right):
+        if isinstance(node, ASTImplication):
+            left = -left
+        gate = self.gates[node] = self.solver.new_variable()
+        if isinstance(node, ASTAnd):
+            self.solver.add_clause([-gate, left])
+            self.solver.add_clause([-gate, right])
+            self.solver.add_clause([gate, -left, -right])
+        else:
+            self.solver.add_clause([gate, -left])
+            self.solver.add_clause([gate, -right])
+            self.solver.add_clause([-gate, left, right])
+        return gate
+
+    def assert_formula(self, node):
+        self.solver.add_clause([self.encode(node)])
+
+    def valuation(self):
+        return {name: self.solver.values[variable] == 1 for name, variable in self.variables.items()}
+
+
+def luby(index):
+    size, sequence = 1, 0
+    while size < index + 1:
+        sequence += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        sequence -= 1
+        index %= size
+    return 1 << sequence
+
+
+class Solver:
+    def __init__(self):
+        self.count = 0
+        self.clauses = []
+        self.watches = {}
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activities = [0.0]
+        self.heap = []
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.increment = 1.0
+        self.glues = {}
+        self.reduce_limit = REDUCE_BASE
+        self.unsatisfiable = False
+        self.proof = []
+        self.statistics = {"decisions": 0, "propagations": 0, "conflicts": 0, "restarts": 0, "learned": 0,
+                           "deleted": 0}
+
+    def new_variable(self):
+        self.count += 1
+        for table, initial in ((self.values, 0), (self.levels, 0), (self.reasons, None), (self.phases, False),
+                               (self.activities, 0.0)):
+            table.append(initial)
+        self.watches[self.count] = []
+        self.watches[-self.count] = []
+        heappush(self.heap, (0.0, self.count))
+        return self.count
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        if self.limits:
+            self.backtrack(0)
+        clause = []
+        for literal in dict.fromkeys(literals):
+            if -literal in clause or self.value(literal) == 1:
+                return
+            if self.value(literal) == 0:
+                clause.append(literal)
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.statistics["propagations"] += 1
+            watchers = self.watches[false]
+            keep = []
+            for position, index in enumerate(watchers):
+                clause = self.clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) == 1:
+                    keep.append(index)
+                    continue
+                for other in range(2, len(clause)):
+                    if self.value(clause[other]) != -1:
+                        clause[1], clause[other] = clause[other], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    keep.append(index)
+                    if self.value(clause[0]) == -1:
+                        keep.extend(watchers[position + 1:])
+                        self.watches[false] = keep
+                        return index
+                    self.assign(clause[0], index)
+            self.watches[false] = keep
+        return None
+
+    def bump(self, variable):
+        self.activities[variable] += self.increment
+        if self.activities[variable] > 1e100:
+            self.activities = [activity * 1e-100 for activity in self.activities]
+            self.increment *= 1e-100
+            self.rebuild_heap()
+        elif self.values[variable] == 0:
+            heappush(self.heap, (-self.activities[variable], variable))
+            if len(self.heap) > HEAP_SLACK * self.count:
+                self.rebuild_heap()
+
+    def rebuild_heap(self):
+        self.heap = [(-self.activities[variable], variable) for variable in range(1, self.count + 1)
+                     if self.values[variable] == 0]
+        heapify(self.heap)
+
+    def analyze(self, conflict):
+        learned = [None]
+        seen = set()
+        counter = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == len(self.limits):
+                    counter += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learned[0] = -literal
+        level = 0
+        if len(learned) > 1:
+            highest = max(range(1, len(learned)), key=lambda index: self.levels[abs(learned[index])])
+            learned[1], learned[highest] = learned[highest], learned[1]
+            level = self.levels[abs(learned[1])]
+        return learned, level
+
+    def backtrack(self, level):
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heappush(self.heap, (-self.activities[variable], variable))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+        if len(self.heap) > HEAP_SLACK * self.count:
+            self.rebuild_heap()
+
+    def reduce(self):
+        locked = {reason for reason in self.reasons if reason is not None}
+        candidates = sorted((index for index, glue in self.glues.items() if glue > GLUE and index not in locked),
+                            key=lambda index: (self.glues[index], len(self.clauses[index])))
+        deleted = set(candidates[len(candidates) // 2:])
+        positions = {}
+        clauses = []
+        for index, clause in enumerate(self.clauses):
+            if index not in deleted:
+                positions[index] = len(clauses)
+                clauses.append(clause)
+        self.clauses = clauses
+        self.glues = {positions[index]: glue for index, glue in self.glues.items() if index not in deleted}
+        self.reasons = [None if reason is None else positions[reason] for reason in self.reasons]
+        for watchers in self.watches.values():
+            watchers.clear()
+        for index, clause in enumerate(clauses):
+            self.watches[clause[0]].append(index)
+            self.watches[clause[1]].append(index)
+        self.statistics["deleted"] += len(deleted)
+
+    def decide(self):
+        while self.heap:
+            activity, variable = heappop(self.heap)
+            if self.values[variable] == 0 and -activity == self.activities[variable]:
+                return variable if self.phases[variable] else -variable
+        for variable in range(1, self.count + 1):
+            if self.values[variable] == 0:
+                return variable if self.phases[variable] else -variable
+        return None
+
+    def solve(self, deadline=None):
+        if self.unsatisfiable:
+            if not self.proof or self.proof[-1]:
+                self.proof.append([])
+            return False
+        restarts = 0
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.statistics["conflicts"] += 1
+                budget -= 1
+                if not self.limits:
+                    self.unsatisfiable = True
+                    self.proof.append([])
+                    return False
+                learned, level = self.analyze(conflict)
+                glue = len({self.levels[abs(literal)] for literal in learned})
+                self.backtrack(level)
+                self.proof.append(learned)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.statistics["learned"] += 1
+                    index = self.watch(learned)
+                    self.glues[index] = glue
+                    self.assign(learned[0], index)
+                self.increment /= ACTIVITY_DECAY
+                if deadline is not None and self.statistics["conflicts"] % DEADLINE_INTERVAL == 0\
+                        and monotonic() > deadline:
+                    return None
+                continue
+            if budget <= 0:
+                restarts += 1
+                self.statistics["restarts"] += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.backtrack(0)
+                if len(self.glues) >= self.reduce_limit:
+                    self.reduce()
+                    self.reduce_limit += REDUCE_STEP
+                continue
+            literal = self.decide()
+            if literal is None:
+                return True
+            self.statistics["decisions"] += 1
+            self.limits.append(len(self.trail))
+            self.assign(literal, None)
+
+
+class Result:
+    def __init__(self, holds, valuation=None, proof=None, statistics=None):
+        self.holds = holds
+        self.valuation = valuation
+        self.proof = proof
+        self.statistics = statistics or {}
+
+    def drup(self):
+        return "\n".join(" ".join(map(str, clause + [0])) for clause in self.proof or [])
+
+    def __bool__(self):
+        return self.holds
+
+
+def satisfiable(ast):
+    encoder = Tseitin()
+    encoder.assert_formula(ast)
+    if encoder.solver.solve():
+        return Result(True, encoder.valuation(), statistics=encoder.solver.statistics)
+    return Result(False, proof=encoder.solver.proof, statistics=encoder.solver.statistics)
+
+
+def valid(ast):
+    encoder = Tseitin()
+    encoder.solver.add_clause([-encoder.encode(ast)])
+    if encoder.solver.solve():
+        return Result(False, encoder.valuation(), statistics=encoder.solver.statistics)
+    return Result(True, proof=encoder.solver.proof, statistics=encoder.solver.statistics)
@@ -0,0 +1,283 @@
+import mmap
+import struct
+import sys
+from array import array
+from formula import Formula
+from tokenizer import Token
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTEquality, ASTInequality, ASTNot, ASTExists, ASTForAll,\
+    ASTVariable, ASTPredicate, ASTFunction, DepthError, bounded
+
+MAGIC = b"LGCF"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIII")
+FIRST_ORDER = 1
+
+AND, OR, IMPLIES, EQUALS, NOT_EQUALS, NOT, EXISTS, FORALL, FREE, BOUND, PREDICATE, FUNCTION = range(12)
+BINARY = {ASTAnd: AND, ASTOr: OR, ASTImplication: IMPLIES, ASTEquality: EQUALS, ASTInequality: NOT_EQUALS}
+QUANTIFIERS = {ASTExists: EXISTS, ASTForAll: FORALL}
+CONNECTIVES = {AND: (ASTAnd, "^"), OR: (ASTOr, "v"), IMPLIES: (ASTImplication, "->"), EQUALS: (ASTEquality, "=="),
+               NOT_EQUALS: (ASTInequality, "!="), EXISTS: (ASTExists, "exists"), FORALL: (ASTForAll, "forall")}
+
+
+def words(data):
+    view = memoryview(data).cast("I")
+    if sys.byteorder == "little":
+        return view
+    swapped = array("I", view)
+    swapped.byteswap()
+    return swapped
+
+
+class Writer:
+    def __init__(self, path):
+        self.path = path
+        self.index = array("I")
+        self.words = array("I")
+        self.symbols = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+
+    def symbol(self, name):
+        if name not in self.symbols:
+            self.symbols[name] = len(self.symbols)
+        return self.symbols[name]
+
+    def add(self, formula):
+        start = len(self.words)
+        try:
+            self.encode(formula.ast)
+        except RecursionError:
+            del self.words[start:]
+            raise DepthError("serialize") from None
+        self.index.extend((start, len(self.words) - start, FIRST_ORDER if formula.first_order else 0))
+        return len(self.index) // 3 - 1
+
+    def encode(self, node):
+        emit = self.words.append
+        if type(node) in BINARY:
+            position = len(self.words)
+            emit(0)
+            self.encode(node.left)
+            self.words[position] = BINARY[type(node)] | (len(self.words) - position - 1) << 4
+            self.encode(node.right)
+        elif isinstance(node, ASTNot):
+            emit(NOT)
+            self.encode(node.child)
+        elif type(node) in QUANTIFIERS:
+            emit(QUANTIFIERS[type(node)] | self.symbol(node.name) << 4)
+            self.encode(node.child)
+        elif isinstance(node, ASTVariable):
+            if isinstance(node.token, int):
+                emit(BOUND | node.token << 4)
+                emit(self.symbol(node.name))
+            else:
+                emit(FREE | self.symbol(node.token) << 4)
+        elif isinstance(node, (ASTPredicate, ASTFunction)):
+            emit((PREDICATE if isinstance(node, ASTPredicate) else FUNCTION) | self.symbol(node.token) << 4)
+            emit(node.arity)
+            for child in node.children:
+                self.encode(child)
+        else:
+            raise ValueError(f"Cannot serialize '{node.unparse()}'")
+
+    def close(self):
+        names = [name.encode() for name in self.symbols]
+        offsets = array("I", [0])
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+        sections = [self.index, self.words, offsets]
+        if sys.byteorder != "little":
+            sections = [array("I", section) for section in sections]
+            for section in sections:
+                section.byteswap()
+        with open(self.path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.index) // 3, len(names), len(self.words),
+                                   offsets[-1]))
+            for section in sections:
+                file.write(section.tobytes())
+            file.write(b"".join(names))
+
+
+def write(path, formulas):
+    with Writer(path) as writer:
+        for formula in formulas:
+            writer.add(formula)
+
+
+class Corpus:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, symbols, length, _ = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a formula corpus")
+        self.view = memoryview(self.map)
+        start = HEADER.size
+        self.index = words(self.view[start:start + 12 * count])
+        start += 12 * count
+        self.words = words(self.view[start:start + 4 * length])
+        start += 4 * length
+        self.offsets = words(self.view[start:start + 4 * (symbols + 1)])
+        self.names = start + 4 * (symbols + 1)
+        self.symbols = [None] * symbols
+        self.tokens = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in (self.index, self.words, self.offsets, self.view):
+            if isinstance(view, memoryview):
+                view.release()
+        self.map.close()
+
+    def __len__(self):
+        return len(self.index) // 3
+
+    def __getitem__(self, index):
+        return Formula.from_ast(self.ast(index), self.first_order(index))
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def span(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(f"Formula {index} out of range")
+        start = self.index[3 * index]
+        return start, start + self.index[3 * index + 1]
+
+    def first_order(self, index):
+        return bool(self.index[3 * index + 2] & FIRST_ORDER)
+
+    def symbol(self, index):
+        if self.symbols[index] is None:
+            start = self.names + self.offsets[index]
+            self.symbols[index] = str(self.view[start:start + self.offsets[index + 1] - self.offsets[index]], "utf-8")
+        return self.symbols[index]
+
+    def token(self, tokentype, name):
+        if (tokentype, name) not in self.tokens:
+            self.tokens[tokentype, name] = Token(tokentype, name, name, -1)
+        return self.tokens[tokentype, name]
+
+    def ast(self, index):
+        start, end = self.span(index)
+        node, position = bounded("deserialize", self.decode, start)
+        if position != end:
+            raise ValueError(f"Formula {index} is corrupt")
+        return node
+
+    def decode(self, position):
+        word = self.words[position]
+        opcode, operand = word & 15, word >> 4
+        if opcode in CONNECTIVES and opcode not in (EXISTS, FORALL):
+            left, position = self.decode(position + 1)
+            right, position = self.decode(position)
+            cls, symbol = CONNECTIVES[opcode]
+            return cls(self.token("sym", symbol), left, right), position
+        if opcode == NOT:
+            child, position = self.decode(position + 1)
+            return ASTNot(self.token("sym", "~"), child), position
+        if opcode in (EXISTS, FORALL):
+            child, position = self.decode(position + 1)
+            cls, symbol = CONNECTIVES[opcode]
+            return cls(self.token("sym", symbol), self.token("id", self.symbol(operand)), child, False), position
+        if opcode == FREE:
+            return ASTVariable(self.token("id", self.symbol(operand))), position + 1
+        if opcode == BOUND:
+            return ASTVariable(self.token("id", self.symbol(self.words[position + 1])), operand), position + 2
+        if opcode in (PREDICATE, FUNCTION):
+            arity = self.words[position + 1]
+            position += 2
+            children = []
+            for _ in range(arity):
+                child, position = self.decode(position)
+                children.append(child)
+            cls = ASTPredicate if opcode == PREDICATE else ASTFunction
+            return cls(self.token("id", self.symbol(operand)), children), position
+        raise ValueError(f"Unknown opcode {opcode} at {position}")
+
+    def evaluate(self, index, model=None, valuation=None):
+        start, end = self.span(index)
+        return self.formula_value(start, end, [], valuation or {}, model)
+
+    def formula_value(self, position, end, env, valuation, model):
+        word = self.words[position]
+        opcode = word & 15
+        if opcode <= IMPLIES:
+            middle = position + 1 + (word >> 4)
+            left = self.formula_value(position + 1, middle, env, valuation, model)
+            if opcode == AND:
+                return left and self.formula_value(middle, end, env, valuation, model)
+            if opcode == OR:
+                return left or self.formula_value(middle, end, env, valuation, model)
+            return not left or self.formula_value(middle, end, env, valuation, model)
+        if opcode <= NOT_EQUALS:
+            left, middle = self.term_value(position + 1, env, valuation, model)
+            right, _ = self.term_value(middle, env, valuation, model)
+            return (left == right) == (opcode == EQUALS)
+        if opcode == NOT:
+            return not self.formula_value(position + 1, end, env, valuation, model)
+        if opcode <= FORALL:
+            target = opcode == EXISTS
+            env.append(None)
+            try:
+                for entry in model.universe:
+                    env[-1] = entry
+                    if bool(self.formula_value(position + 1, end, env, valuation, model)) == target:
+                        return target
+            finally:
+                env.pop()
+            return not target
+        if opcode == PREDICATE:
+            name = self.symbol(word >> 4)
+            if name not in model.predicates:
+                raise KeyError(f"Predicate '{name}' does not appear in function map")
+            args, _ = self.arguments(position + 2, self.words[position + 1], env, valuation, model)
+            return model.predicates[name](*args)
+        value, _ = self.term_value(position, env, valuation, model)
+        return value
+
+    def arguments(self, position, arity, env, valuation, model):
+        args = []
+        for _ in range(arity):
+            value, position = self.term_value(position, env, valuation, model)
+            args.append(value)
+        return args, position
+
+    def term_value(self, position, env, valuation, model):
+        word = self.words[position]
+        opcode, operand = word & 15, word >> 4
+        if opcode == BOUND:
+            return env[len(env) - 1 - operand], position + 2
+        if opcode == FREE:
+            name = self.symbol(operand)
+            if name in valuation:
+                value = valuation[name]
+            elif model is not None and name in model.functions:
+                value = model.functions[name]()
+            else:
+                raise KeyError(f"Variable '{name}' does not appear in valuation or function map")
+        elif opcode == FUNCTION:
+            name = self.symbol(operand)
+            if name not in model.functions:
+                raise KeyError(f"Function '{name}' does not appear in function map")
+            args, position = self.arguments(position + 2, self.words[position + 1], env, valuation, model)
+            return self.member(model.functions[name](*args), model), position
+        else:
+            raise ValueError(f"Expected term at {position}")
+        return self.member(value, model), position + 1
+
+    @staticmethod
+    def member(value, model):
+        if model is not None and value not in model.members:
+            raise KeyError(f"Value '{value}' does not appear in universe")
+        return value
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from formula import Formula, Language, Model, freeze
+from parser import ParsingError
+from syntax import ASTValidationError, LanguageValidationError, DepthError
+from client import PORT, LINE_LIMIT, WINDOW
+from cli import describe
+import parallel
+
+CACHE_SIZE = 1024
+BATCH_SIZE = 64
+BATCHES_PER_WORKER = 2
+ERRORS = (ParsingError, ASTValidationError, LanguageValidationError, KeyError, ValueError, TypeError)
+
+
+class Cache:
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            value = self.entries[key]
+        else:
+            self.misses += 1
+            try:
+                value = build()
+            except ERRORS as error:
+                value = error
+            self.entries[key] = value
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        if isinstance(value, Exception):
+            raise value.with_traceback(None)
+        return value
+
+
+def registered(registry, kind, name):
+    if name not in registry:
+        raise KeyError(f"{kind} '{name}' is not registered")
+    return registry[name]
+
+
+def parse(state, request):
+    string = request["formula"]
+    first_order = request.get("first_order", True)
+    language = request.get("language")
+
+    def build():
+        return Formula(string, first_order, registered(state["languages"], "Language", language)
+                       if language is not None else None)
+    return (string, first_order, language), state["formulas"].get((string, first_order, language), build)
+
+
+def process(state, request):
+    response = {"id": request.get("id")}
+    string = request.get("formula", "")
+    try:
+        key, formula = parse(state, request)
+        if request.get("op") == "parse":
+            response["unparse"] = formula.ast.unparse()
+            response["free"] = sorted(formula.ast.free_variables())
+        else:
+            name = request.get("model")
+            model = registered(state["models"], "Model", name)
+            valuation = {variable: freeze(value) for variable, value in (request.get("valuation") or {}).items()}
+            try:
+                compiled = state["compiled"].get(key + (name,), lambda: formula.compile(model))
+                response["value"] = bool(compiled.value(valuation))
+            except DepthError:
+                response["value"] = bool(formula.ast.value(dict(valuation), model))
+    except ERRORS as error:
+        response["error"] = describe(error, string)
+    return response
+
+
+def respond(state, request):
+    try:
+        return process(state, request)
+    except Exception as error:
+        return {"id": request.get("id"), "error": describe(error, "")}
+
+
+def counters(state):
+    formulas, compiled = state["formulas"], state["compiled"]
+    return {"formulas": len(formulas.entries), "compiled": len(compiled.entries),
+            "hits": formulas.hits + compiled.hits, "misses": formulas.misses + compiled.misses}
+
+
+def process_batch(requests):
+    return [respond(parallel.worker, request) for request in requests], os.getpid(), counters(parallel.worker)
+
+
+class Connection:
+    def __init__(self, writer, window):
+        self.writer = writer
+        self.window = window
+        self.pending = 0
+        self.idle = asyncio.Event()
+        self.ready = asyncio.Event()
+        self.idle.set()
+        self.ready.set()
+
+    def expect(self):
+        self.pending += 1
+        self.idle.clear()
+        if self.pending >= self.window:
+            self.ready.clear()
+
+    def send(self, response):
+        self.pending -= 1
+        if not self.pending:
+            self.idle.set()
+        if self.pending < self.window:
+            self.ready.set()
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(response).encode() + b"\n")
+
+
+class Server:
+    def __init__(self, workers=0, cache_size=CACHE_SIZE, batch_size=BATCH_SIZE, window=WINDOW):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.window = window
+        self.state = self.snapshot({}, {})
+        self.executor = None
+        self.counters = {}
+        self.queue = None
+        self.statistics = {"connections": 0, "requests": 0, "batches": 0}
+
+    def snapshot(self, models, languages):
+        return {"models": models, "languages": languages,
+                "formulas": Cache(self.cache_size), "compiled": Cache(self.cache_size)}
+
+    def register(self, request):
+        name = request["name"]
+        models, languages = dict(self.state["models"]), dict(self.state["languages"])
+        if request["op"] == "model":
+            models[name] = Model.from_dict(request["model"])
+        else:
+            languages[name] = Language(dict(request.get("functions") or {}), dict(request.get("predicates") or {}))
+        self.state = self.snapshot(models, languages)
+        self.counters = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def control(self, request):
+        response = {"id": request.get("id")}
+        op = request.get("op")
+        try:
+            if op in ("model", "language"):
+                self.register(request)
+                response["name"] = request["name"]
+            elif op == "stats":
+                if self.workers:
+                    caches = {key: sum(entry[key] for entry in self.counters.values())
+                              for key in ("formulas", "compiled", "hits", "misses")}
+                else:
+                    caches = counters(self.state)
+                response["statistics"] = dict(
+                    self.statistics, workers=self.workers, models=sorted(self.state["models"]),
+                    languages=sorted(self.state["languages"]), **caches
+                )
+            else:
+                raise ValueError(f"Unknown operation '{op}'")
+        except (KeyError, ValueError, TypeError) as error:
+            response["error"] = describe(error, "")
+        return response
+
+    def pool(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                self.workers, mp_context=get_context("fork"), initializer=parallel.initialize,
+                initargs=(self.state,)
+            )
+        return self.executor
+
+    async def handle(self, reader, writer):
+        self.statistics["connections"] += 1
+        connection = Connection(writer, self.window)
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                await connection.ready.wait()
+                self.statistics["requests"] += 1
+                connection.expect()
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    connection.send({"id": None, "error": describe(error, "")})
+                    continue
+                if not isinstance(request, dict):
+                    connection.send({"id": None, "error": describe(ValueError("Request must be a JSON object"), "")})
+                    continue
+                if request.get("op", "check") in ("check", "parse"):
+                    self.queue.put_nowait((request, connection, self.state))
+                else:
+                    connection.send(self.control(request))
+            await connection.idle.wait()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        held = None
+        while True:
+            batch = [held or await self.queue.get()]
+            held = None
+            state = batch[0][2]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item[2] is not state:
+                    held = item
+                    break
+                batch.append(item)
+            requests = [request for request, _, _ in batch]
+            self.statistics["batches"] += 1
+            try:
+                if self.workers and state is self.state:
+                    responses, pid, entry = await loop.run_in_executor(self.pool(), process_batch, requests)
+                    if state is self.state:
+                        self.counters[pid] = entry
+                else:
+                    responses = [respond(state, request) for request in requests]
+            except Exception as error:
+                responses = [{"id": request.get("id"), "error": describe(error, "")} for request in requests]
+            for (_, connection, _), response in zip(batch, responses):
+                connection.send(response)
+            for connection in {connection for _, connection, _ in batch}:
+                try:
+                    await connection.writer.drain()
+                except ConnectionError:
+                    pass
+
+    async def serve(self, host="127.0.0.1", port=PORT, path=None):
+        self.queue = asyncio.Queue()
+        consumers = [asyncio.create_task(self.run_batches())
+                     for _ in range(max(1, self.workers * BATCHES_PER_WORKER))]
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path, limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        address = path or ":".join(str(part) for part in server.sockets[0].getsockname()[:2])
+        print(f"listening on {address}", file=sys.stderr, flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description="Serve formula parsing and evaluation as newline-delimited JSON.")
+    arguments.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    arguments.add_argument("--port", type=int, default=PORT, help=f"TCP port (default: {PORT})")
+    arguments.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    arguments.add_argument("-w", "--workers", type=int, default=0,
+                           help="worker processes (default: evaluate in the server process)")
+    arguments.add_argument("-c", "--cache-size", type=int, default=CACHE_SIZE, help="parsed formulas to keep")
+    arguments.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE, help="requests per task")
+    arguments.add_argument("--window", type=int, default=WINDOW, help="requests in flight per connection")
+    options = arguments.parse_args(argv)
+    server = Server(options.workers, options.cache_size, options.batch_size, options.window)
+    try:
+        asyncio.run(server.serve(options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,724 @@
+from collections import OrderedDict
+from operator import itemgetter
+from weakref import WeakValueDictionary
+from tokenizer import Token
+
+
+class ASTValidationError(Exception):
+    def __init__(self, node, token=None):
+        self.node = node
+        self.token = node.data if token is None else token
+
+    def __str__(self):
+        return f"'{self.node.unparse()}'"
+
+
+class LanguageValidationError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+
+class DepthError(ValueError):
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __str__(self):
+        return f"Formula is nested too deeply to {self.operation}"
+
+
+def bounded(operation, function, *args):
+    try:
+        return function(*args)
+    except RecursionError:
+        raise DepthError(operation) from None
+
+
+class CompilationContext:
+    def __init__(self, model, free, cache_size=None, binders=0):
+        self.model = model
+        self.elements = model.universe
+        self.universe = range(len(model.universe))
+        self.free = {name: slot for slot, name in enumerate(free)}
+        self.depth = binders
+        self.size = len(self.free) + binders
+        self.cache_size = cache_size
+        self.reads = []
+
+    def compile(self, node):
+        if self.cache_size is None:
+            return node.compile(self)
+        self.reads.append(set())
+        function = node.compile(self)
+        reads = {slot for slot in self.reads.pop() if slot < len(self.free) + self.depth}
+        if self.reads:
+            self.reads[-1] |= reads
+        if node.is_formula and self.depth and len(self.free) + self.depth - 1 not in reads:
+            return memoize(function, sorted(reads), self.cache_size)
+        return function
+
+    def condition(self, node):
+        function = self.compile(node)
+        if not node.is_term:
+            return function
+        elements = self.elements
+        return lambda env: elements[function(env)]
+
+    def read(self, slot):
+        if self.reads:
+            self.reads[-1].add(slot)
+        return itemgetter(slot)
+
+    def bind(self):
+        slot = len(self.free) + self.depth
+        self.depth += 1
+        self.size = max(self.size, slot + 1)
+        return slot
+
+    def unbind(self):
+        self.depth -= 1
+
+    def bound_slot(self, reference):
+        return len(self.free) + self.depth - 1 - reference
+
+    def function(self, name):
+        if name not in self.model.functions:
+            raise KeyError(f"Function '{name}' does not appear in function map")
+        return self.model.indexed_function(name)
+
+    def predicate(self, name):
+        if name not in self.model.predicates:
+            raise KeyError(f"Predicate '{name}' does not appear in function map")
+        return self.model.indexed_predicate(name)
+
+
+def memoize(function, slots, size):
+    cache = OrderedDict()
+    key = itemgetter(*slots) if slots else lambda env: ()
+
+    def memoized(env):
+        entry = key(env)
+        if entry in cache:
+            cache.move_to_end(entry)
+            return cache[entry]
+        value = cache[entry] = function(env)
+        if len(cache) > size:
+            cache.popitem(last=False)
+        return value
+    return memoized
+
+
+def compile_call(function, arguments):
+    if not arguments:
+        return lambda env: function()
+    if len(arguments) == 1:
+        first, = arguments
+        return lambda env: function(first(env))
+    if len(arguments) == 2:
+        first, second = arguments
+        return lambda env: function(first(env), second(env))
+    return lambda env: function(*[argument(env) for argument in arguments])
+
+
+class Shape:
+    __slots__ = ("__weakref__",)
+
+
+class Interned(type):
+    nodes = WeakValueDictionary()
+    shapes = WeakValueDictionary()
+
+    def __call__(cls, *args):
+        node = super().__call__(*args)
+        return Interned.nodes.setdefault(node.key(), node)
+
+
+class ASTNode(metaclass=Interned):
+    __slots__ = ("data", "children", "shape", "hash", "variables", "__weakref__")
+    is_term = False
+    is_formula = False
+
+    def __init__(self, data, children):
+        data = data.unplaced()
+        children = tuple(children or ())
+        shape_key = (type(self), data.type, data.data) + tuple(id(child.shape) for child in children)
+        self.initialize(
+            data=data,
+            children=children,
+            shape=Interned.shapes.setdefault(shape_key, Shape()),
+            hash=hash((type(self).__name__, data.type, data.data) + tuple(child.hash for child in children)),
+            variables=None
+        )
+
+    def initialize(self, **attributes):
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Cannot set '{name}' of immutable Node")
+
+    def key(self):
+        return (type(self), self.data.type, self.data.data, self.name) + tuple(id(child) for child in self.children)
+
+    @property
+    def name(self):
+        return None
+
+    def arguments(self):
+        return self.data, self.children
+
+    def rebuild(self, children):
+        return type(self)(self.data, children)
+
+    def __reduce__(self):
+        return type(self), self.arguments()
+
+    @property
+    def left(self):
+        if len(self.children) == 2:
+            return self.children[0]
+        raise ValueError("Cannot access 'left' of non-binary Node")
+
+    @property
+    def right(self):
+        if len(self.children) == 2:
+            return self.children[1]
+        raise ValueError("Cannot access 'right' of non-binary Node")
+
+    @property
+    def child(self):
+        if len(self.children) == 1:
+            return self.children[0]
+        raise ValueError("Cannot access 'child' of non-unary Node")
+
+    @property
+    def token(self):
+        return self.data.data
+
+    @property
+    def arity(self):
+        return len(self.children)
+
+    def postorder(self):
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in seen:
+                continue
+            if expanded or not node.children:
+                seen.add(id(node))
+                yield node
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
+    def validate(self, first_order):
+        return all(node.check(first_order) for node in self.postorder())
+
+    def check(self, first_order):
+        return False
+
+    def validate_language(self, language, fill_in):
+        return all(node.check_language(language, fill_in) for node in self.postorder())
+
+    def check_language(self, language, fill_in):
+        return True
+
+    def print(self, indent=0, positions=None):
+        sizes = {}
+        if positions is not None:
+            for node in self.postorder():
+                sizes[node] = 1 + sum(sizes[child] for child in node.children)
+        stack = [(self, indent, 0)]
+        while stack:
+            node, depth, start = stack.pop()
+            data = node.data
+            if positions is not None:
+                data = Token(data.type, data.data, data.read_data, positions[start + sizes[node] - 1])
+            print(depth * "  " + str(data))
+            children = []
+            for child in node.children:
+                children.append((child, depth + 1, start))
+                start += sizes.get(child, 0)
+            stack.extend(reversed(children))
+
+    def unparse(self):
+        parts = []
+        stack = [self]
+        while stack:
+            part = stack.pop()
+            if isinstance(part, str):
+                parts.append(part)
+            else:
+                stack.extend(reversed(part.unparse_parts()))
+        return "".join(parts)
+
+    def unparse_parts(self):
+        return ["?"]
+
+    def value(self, valuation, model=None):
+        stack = [self.evaluate(valuation, model)]
+        result = None
+        while stack:
+            try:
+                child = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                continue
+            if isinstance(child, ASTVariable):
+                result = child.value(valuation, model)
+            else:
+                stack.append(child.evaluate(valuation, model))
+                result = None
+        return result
+
+    def evaluate(self, valuation, model):
+        return None
+        yield
+
+    def compile(self, context):
+        raise ValueError(f"Cannot compile '{self.unparse()}'")
+
+    @property
+    def free(self):
+        return self.free_variables()
+
+    def free_variables(self):
+        if self.variables is None:
+            stack = [(self, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if node.variables is not None:
+                    continue
+                if not expanded:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in node.children if child.variables is None)
+                    continue
+                free = frozenset()
+                for child in node.children:
+                    if not child.variables <= free:
+                        free = free | child.variables
+                node.initialize(variables=free)
+        return self.variables
+
+    def substitute_references(self, identifier, reference):
+        results = {}
+        stack = [(self, reference, False)]
+        while stack:
+            node, depth, expanded = stack.pop()
+            if (id(node), depth) in results:
+                continue
+            if isinstance(node, ASTVariable):
+                results[id(node), depth] = node.substitute_references(identifier, depth)
+                continue
+            inner = depth + 1 if isinstance(node, ASTQuantifier) else depth
+            if not expanded:
+                stack.append((node, depth, True))
+                stack.extend((child, inner, False) for child in reversed(node.children))
+                continue
+            children = [results[id(child), inner] for child in node.children]
+            if all(child is old for child, old in zip(children, node.children)):
+                results[id(node), depth] = node
+            else:
+                results[id(node), depth] = node.rebuild(children)
+        return results[id(self), reference]
+
+    def fresh(self, identifier):
+        return all(node.fresh(identifier) for node in self.postorder() if isinstance(node, ASTVariable))
+
+    def __eq__(self, other):
+        if not isinstance(other, ASTNode):
+            return NotImplemented
+        return self.shape is other.shape
+
+    def __hash__(self):
+        return self.hash
+
+
+class ASTBinary(ASTNode):
+    __slots__ = ()
+    is_formula = True
+
+    def __init__(self, symbol, left, right):
+        super().__init__(symbol, [left, right])
+
+    def arguments(self):
+        return self.data, self.left, self.right
+
+    def rebuild(self, children):
+        return type(self)(self.data, *children)
+
+    def check(self, first_order):
+        if not first_order or (self.left.is_formula and self.right.is_formula):
+            return True
+        raise ASTValidationError(self)
+
+    def unparse_parts(self):
+        if self.left.is_term or isinstance(self.left, ASTPredicate)\
+                or (self.token == self.left.token and not self.data.is_symbol("->"))\
+                or (self.data.is_symbol("->") and self.left.data.is_symbol("v", "^")):
+            left = [self.left]
+        else:
+            left = ["(", self.left, ")"]
+        if self.right.is_term or isinstance(self.right, ASTPredicate)\
+                or self.token == self.right.token\
+                or (self.data.is_symbol("->") and self.right.data.is_symbol("v", "^")):
+            right = [self.right]
+        else:
+            right = ["(", self.right, ")"]
+        return left + [f" {self.token} "] + right
+
+
+class ASTAnd(ASTBinary):
+    __slots__ = ()
+
+    def __init__(self, symbol, left, right):
+        super().__init__(symbol, left, right)
+
+    def evaluate(self, valuation, model):
+        return (yield self.left) and (yield self.right)
+
+    def compile(self, context):
+        left, right = context.condition(self.left), context.condition(self.right)
+        return lambda env: left(env) and right(env)
+
+
+class ASTOr(ASTBinary):
+    __slots__ = ()
+
+    def __init__(self, symbol, left, right):
+        super().__init__(symbol, left, right)
+
+    def evaluate(self, valuation, model):
+        return (yield self.left) or (yield self.right)
+
+    def compile(self, context):
+        left, right = context.condition(self.left), context.condition(self.right)
+        return lambda env: left(env) or right(env)
+
+
+class ASTImplication(ASTBinary):
+    __slots__ = ()
+
+    def __init__(self, symbol, left, right):
+        super().__init__(symbol, left, right)
+
+    def evaluate(self, valuation, model):
+        value_left = yield self.left
+        return not value_left or (value_left and (yield self.right))
+
+    def compile(self, context):
+        left, right = context.condition(self.left), context.condition(self.right)
+        return lambda env: not left(env) or right(env)
+
+
+class ASTEquality(ASTBinary):
+    __slots__ = ()
+
+    def __init__(self, symbol, left, right):
+        super().__init__(symbol, left, right)
+
+    def check(self, first_order):
+        if first_order and self.left.is_term and self.right.is_term:
+            return True
+        raise ASTValidationError(self)
+
+    def evaluate(self, valuation, model):
+        return (yield self.left) == (yield self.right)
+
+    def compile(self, context):
+        left, right = context.compile(self.left), context.compile(self.right)
+        return lambda env: left(env) == right(env)
+
+
+class ASTInequality(ASTBinary):
+    __slots__ = ()
+
+    def __init__(self, symbol, left, right):
+        super().__init__(symbol, left, right)
+
+    def check(self, first_order):
+        if first_order and self.left.is_term and self.right.is_term:
+            return True
+        raise ASTValidationError(self)
+
+    def evaluate(self, valuation, model):
+        return (yield self.left) != (yield self.right)
+
+    def compile(self, context):
+        left, right = context.compile(self.left), context.compile(self.right)
+        return lambda env: left(env) != right(env)
+
+
+class ASTNot(ASTNode):
+    __slots__ = ()
+    is_formula = True
+
+    def __init__(self, symbol, formula):
+        super().__init__(symbol, [formula])
+
+    def arguments(self):
+        return self.data, self.child
+
+    def rebuild(self, children):
+        return ASTNot(self.data, *children)
+
+    def check(self, first_order):
+        if not first_order or self.child.is_formula:
+            return True
+        raise ASTValidationError(self)
+
+    def unparse_parts(self):
+        if self.child.is_term or isinstance(self.child, (ASTPredicate, ASTNot)):
+            return [self.token, self.child]
+        return [f"{self.token}(", self.child, ")"]
+
+    def evaluate(self, valuation, model):
+        return not (yield self.child)
+
+    def compile(self, context):
+        child = context.condition(self.child)
+        return lambda env: not child(env)
+
+
+class ASTQuantifier(ASTNode):
+    __slots__ = ("identifier",)
+    is_formula = True
+    target = None
+
+    def __init__(self, symbol, identifier, formula, bind=True):
+        if bind:
+            formula = formula.substitute_references(identifier, 0)
+        self.initialize(identifier=identifier.unplaced())
+        super().__init__(symbol, [formula])
+
+    @property
+    def name(self):
+        return self.identifier.data
+
+    def arguments(self):
+        return self.data, self.identifier, self.child, False
+
+    def rebuild(self, children):
+        return type(self)(self.data, self.identifier, *children, False)
+
+    def check(self, first_order):
+        if first_order and self.child.is_formula:
+            return True
+        raise ASTValidationError(self)
+
+    def unparse_parts(self):
+        return [f"{self.token} {self.identifier.data}. ", self.child]
+
+    def evaluate(self, valuation, model):
+        key = "$" + self.identifier.data
+        outer = valuation.get(key, valuation)
+        try:
+            for entry in model.universe:
+                valuation[key] = entry
+                if bool((yield self.child)) == self.target:
+                    return self.target
+            return not self.target
+        finally:
+            if outer is valuation:
+                valuation.pop(key, None)
+            else:
+                valuation[key] = outer
+
+    def compile(self, context):
+        slot = context.bind()
+        child = context.condition(self.child)
+        context.unbind()
+        return self.quantify(slot, child, context.universe)
+
+    def quantify(self, slot, child, universe):
+        pass
+
+
+class ASTExists(ASTQuantifier):
+    __slots__ = ()
+    target = True
+
+    def __init__(self, symbol, identifier, formula, bind=True):
+        super().__init__(symbol, identifier, formula, bind)
+
+    def quantify(self, slot, child, universe):
+        def exists(env):
+            for entry in universe:
+                env[slot] = entry
+                if child(env):
+                    return True
+            return False
+        return exists
+
+
+class ASTForAll(ASTQuantifier):
+    __slots__ = ()
+    target = False
+
+    def __init__(self, symbol, identifier, formula, bind=True):
+        super().__init__(symbol, identifier, formula, bind)
+
+    def quantify(self, slot, child, universe):
+        def forall(env):
+            for entry in universe:
+                env[slot] = entry
+                if not child(env):
+                    return False
+            return True
+        return forall
+
+
+class ASTVariable(ASTNode):
+    __slots__ = ("dereferenced",)
+    is_term = True
+
+    def __init__(self, identifier, reference=None):
+        if reference is None:
+            self.initialize(dereferenced=None)
+        else:
+            self.initialize(dereferenced=identifier.unplaced())
+            identifier = Token(identifier.type, reference, identifier.read_data, -1)
+        super().__init__(identifier, [])
+        if reference is None:
+            self.initialize(variables=frozenset((identifier.data,)))
+
+    @property
+    def name(self):
+        if self.dereferenced is None:
+            return None
+        return self.dereferenced.data
+
+    def arguments(self):
+        if self.dereferenced is None:
+            return self.data,
+        return self.dereferenced, self.token
+
+    def rebuild(self, children):
+        return self
+
+    def check(self, first_order):
+        return True
+
+    def substitute_references(self, identifier, reference):
+        if self.token == identifier.data:
+            return ASTVariable(self.data, reference)
+        return self
+
+    def fresh(self, identifier):
+        return not self.token == identifier
+
+    def unparse(self):
+        if isinstance(self.token, int):
+            return self.dereferenced.data
+        return self.token
+
+    def unparse_parts(self):
+        return [self.unparse()]
+
+    def value(self, valuation, model=None):
+        if isinstance(self.token, int):
+            value = valuation["$" + self.dereferenced.data]
+        elif self.token in valuation:
+            value = valuation[self.token]
+        elif model is not None and self.token in model.functions:
+            value = model.functions[self.token]()
+        else:
+            raise KeyError(f"Variable '{self.token}' does not appear in valuation or function map")
+        if model is not None and value not in model.members:
+            raise KeyError(f"Value '{value}' does not appear in universe")
+        return value
+
+    def compile(self, context):
+        if isinstance(self.token, int):
+            return context.read(context.bound_slot(self.token))
+        return context.read(context.free[self.token])
+
+
+class ASTPredicate(ASTNode):
+    __slots__ = ()
+    is_formula = True
+
+    def __init__(self, identfier, arguments):
+        super().__init__(identfier, arguments)
+
+    def check(self, first_order):
+        if first_order and all(child.is_term for child in self.children):
+            return True
+        raise ASTValidationError(self)
+
+    def check_language(self, language, fill_in):
+        if fill_in and self.token not in language.predicate_arities:
+            language.predicate_arities[self.token] = self.arity
+        elif self.token not in language.predicate_arities:
+            raise LanguageValidationError(f"Predicate '{self.token}' not in language")
+        elif language.predicate_arities[self.token] != self.arity:
+            raise LanguageValidationError(
+                f"Arity mismatch for Predicate '{self.token}': {language.predicate_arities[self.token]} != {self.arity}"
+            )
+        return True
+
+    def unparse_parts(self):
+        parts = [f"{self.token}("]
+        for index, child in enumerate(self.children):
+            parts.extend((", ", child) if index else (child,))
+        return parts + [")"]
+
+    def evaluate(self, valuation, model):
+        if self.token not in model.predicates:
+            raise KeyError(f"Predicate '{self.token}' does not appear in function map")
+        args = []
+        for child in self.children:
+            args.append((yield child))
+        return model.predicates[self.token](*args)
+
+    def compile(self, context):
+        return compile_call(context.predicate(self.token), [context.compile(child) for child in self.children])
+
+
+class ASTFunction(ASTNode):
+    __slots__ = ()
+    is_term = True
+
+    def __init__(self, identifier, arguments):
+        super().__init__(identifier, arguments)
+
+    def check(self, first_order):
+        if first_order and all(child.is_term for child in self.children):
+            return True
+        raise ASTValidationError(self)
+
+    def check_language(self, language, fill_in):
+        if fill_in and self.token not in language.function_arities:
+            language.function_arities[self.token] = self.arity
+        elif self.token not in language.function_arities:
+            raise LanguageValidationError(f"Function '{self.token}' not in language")
+        elif language.function_arities[self.token] != self.arity:
+            raise LanguageValidationError(
+                f"Arity mismatch for Function '{self.token}': {language.function_arities[self.token]} != {self.arity}"
+            )
+        return True
+
+    def unparse_parts(self):
+        parts = [f"{self.token}("]
+        for index, child in enumerate(self.children):
+            parts.extend((", ", child) if index else (child,))
+        return parts + [")"]
+
+    def evaluate(self, valuation, model):
+        if self.token not in model.functions:
+            raise KeyError(f"Function '{self.token}' does not appear in function map")
+        args = []
+        for child in self.children:
+            args.append((yield child))
+        value = model.functions[self.token](*args)
+        if value not in model.members:
+            raise KeyError(f"Value '{value}' does not appear in universe")
+        return value
+
+    def compile(self, context):
+        return compile_call(context.function(self.token), [context.compile(child) for child in self.children])
@@ -0,0 +1,46 @@
+import pytest
+from formula import Formula
+
+ENTAILED = [
+    ("(a == b)", "f(a) == f(b)"),
+    ("(a == b)", "f(b) == f(a)"),
+    ("(a == b)", "g(a, c) == g(b, c)"),
+    ("(a == b)", "f(f(a)) == f(f(b))"),
+    ("(a == b) ^ (b == c)", "h(f(a), c) == h(f(c), a)"),
+    ("(f(f(f(a))) == a) ^ (f(f(f(f(f(a))))) == a)", "f(a) == a"),
+    ("(a == b) ^ (f(a) != c)", "f(b) != c"),
+    ("(a == b) ^ (f(a) != c)", "c != f(b)"),
+    ("(a == b) ^ (f(b) != f(c))", "a != c"),
+]
+
+NOT_ENTAILED = [
+    ("(a == b)", "f(a) == f(c)"),
+    ("(f(a) == f(b))", "a == b"),
+    ("(a == b)", "f(a) != f(c)"),
+    ("(a == b) ^ (b != c)", "f(a) != f(c)"),
+]
+
+
+def formula(string):
+    return Formula(string, True)
+
+
+@pytest.mark.parametrize("premises, conclusion", ENTAILED)
+def test_entails_new_terms(premises, conclusion):
+    assert formula(premises).entails(formula(conclusion))
+
+
+@pytest.mark.parametrize("premises, conclusion", NOT_ENTAILED)
+def test_does_not_entail(premises, conclusion):
+    assert not formula(premises).entails(formula(conclusion))
+
+
+def test_equal_adds_both_terms():
+    engine = formula("(a == b)").congruence()
+    assert engine.equal(formula("f(a) == c").ast.left, formula("f(b) == c").ast.left)
+    assert len(engine) == 4
+
+
+def test_inconsistent_premises_entail_anything():
+    assert formula("(a == b) ^ (f(a) != f(b))").entails(formula("c == d"))
+    assert not formula("(a == b) ^ (f(a) != f(b))").congruence().consistent
@@ -0,0 +1,127 @@
+import sys
+from functools import cache
+import pytest
+import serialize
+from formula import Formula, Model, Relation
+from syntax import DepthError
+
+N = 20000
+LARGE = 10 ** 6
+MODEL = Model([0, 1], {"a": lambda: 0, "b": lambda: 1, "f": lambda x: 1 - x}, {"P": Relation({(1,)})})
+
+CASES = {
+    "and chain": (" ^ ".join(f"p{i}" for i in range(N)), False),
+    "or chain": (" v ".join(["P(a) v P(b)"] * (N // 2)), True),
+    "implication chain": (" -> ".join(["p"] * N), False),
+    "negations": ("~" * N + "p", False),
+    "parentheses": ("(" * N + "p" + ")" * N, False),
+    "quantifiers": ("".join(f"exists x{i % 7}. " for i in range(N)) + "P(x3)", True),
+    "nested terms": ("P(" + "f(" * N + "a" + ")" * N + ")", True),
+}
+LARGE_CASES = {
+    "and chain": (" ^ ".join(f"p{i % 1000}" for i in range(LARGE // 2)), False, True),
+    "implication chain": (" -> ".join(["p"] * (LARGE // 2)), False, True),
+    "negations": ("~" * LARGE + "p", False, True),
+    "quantifiers": ("".join(f"exists x{i % 7}. " for i in range(LARGE)) + "P(x3)", True, True),
+    "nested terms": ("P(" + "f(" * LARGE + "a" + ")" * LARGE + ")", True, False),
+}
+
+
+@cache
+def parse(name):
+    string, first_order = CASES[name]
+    return Formula(string, first_order)
+
+
+def valuation(name):
+    return {f"p{i}": True for i in range(N)} if name == "and chain" else {"p": True}
+
+
+def test_limit_is_below_depth():
+    assert sys.getrecursionlimit() < N
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_unparse_round_trip(name):
+    formula = parse(name)
+    string = formula.ast.unparse()
+    assert Formula(string, formula.first_order).ast is formula.ast
+
+
+@pytest.mark.parametrize("name", ["and chain", "implication chain", "negations"])
+def test_unparse_is_canonical(name):
+    string, first_order = CASES[name]
+    assert Formula(string, first_order).ast.unparse() == string
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_value(name):
+    formula = parse(name)
+    expected = {"negations": N % 2 == 0, "nested terms": N % 2 == 1}.get(name, True)
+    assert formula.ast.value(valuation(name), MODEL) == expected
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_validate(name):
+    formula = parse(name)
+    assert formula.ast.validate(formula.first_order)
+    assert Formula.from_ast(formula.ast, formula.first_order).ast is formula.ast
+
+
+def test_equality_of_renamed_quantifiers():
+    left = Formula("".join(f"forall x{i}. " for i in range(N)) + "P(x0)", True).ast
+    right = Formula("".join(f"forall y{i}. " for i in range(N)) + "P(y0)", True).ast
+    other = Formula("".join(f"forall y{i}. " for i in range(N)) + "P(y1)", True).ast
+    assert left is not right
+    assert left == right and hash(left) == hash(right)
+    assert left != other
+
+
+def test_equality_of_long_chains():
+    left = Formula(" ^ ".join(f"p{i}" for i in range(N)), False).ast
+    right = Formula(" ^ ".join(f"p{i}" for i in range(N - 1)) + " ^ q", False).ast
+    assert left != right
+    assert left.left == right.left
+
+
+def test_free_variables():
+    formula = Formula(" ^ ".join(f"P(x{i % 100})" for i in range(N)), True)
+    assert formula.ast.free_variables() == {f"x{i}" for i in range(100)}
+
+
+@pytest.mark.parametrize("name", ["and chain", "implication chain", "negations", "parentheses"])
+def test_satisfiable(name):
+    assert parse(name).is_satisfiable().holds
+
+
+@pytest.mark.parametrize("operation", ["compile", "witness", "to_bdd", "optimize", "find_model", "serialize"])
+def test_recursive_entry_points_raise_depth_error(operation, tmp_path):
+    formula = parse("implication chain")
+    calls = {
+        "compile": lambda: formula.compile(MODEL).value({"p": True}),
+        "witness": lambda: formula.witness(MODEL, {"p": True}),
+        "to_bdd": lambda: formula.to_bdd(),
+        "optimize": lambda: formula.optimize(MODEL),
+        "find_model": lambda: Formula(" -> ".join(["P(a)"] * N), True).find_model(1),
+        "serialize": lambda: serialize.write(tmp_path / "corpus", [formula]),
+    }
+    with pytest.raises(DepthError):
+        calls[operation]()
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("name", LARGE_CASES)
+def test_million_nodes(name):
+    string, first_order, expected = LARGE_CASES[name]
+    formula = Formula(string, first_order)
+    assert formula.ast.unparse() == string
+    assert formula.ast.value({"p": True, **{f"p{i}": True for i in range(1000)}}, MODEL) == expected
+    assert formula.ast.validate(first_order)
+
+
+@pytest.mark.slow
+def test_million_nodes_equality():
+    left = Formula("".join(f"forall x{i}. " for i in range(LARGE // 2)) + "P(x0)", True).ast
+    right = Formula("".join(f"forall y{i}. " for i in range(LARGE // 2)) + "P(y0)", True).ast
+    assert left is not right
+    assert left == right
@@ -0,0 +1,28 @@
+import pytest
+from cli import describe
+from formula import Formula
+from syntax import ASTValidationError
+
+
+def test_print_reports_each_occurrence(capsys):
+    Formula("forall x. P(x, 1, add(x, 1))", True).print()
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.strip() for line in lines] == [
+        "'forall' (sym, 0)", "'P' (id, 10)", "<0> (id, 12)", "'1' (id, 15)", "'add' (id, 18)", "<0> (id, 22)",
+        "'1' (id, 25)",
+    ]
+
+
+def test_interned_nodes_carry_no_position():
+    formula = Formula("P(x) ^ P(x)", True)
+    assert formula.ast.left is formula.ast.right
+    assert formula.ast.left.data.part == -1
+
+
+@pytest.mark.parametrize("string, position", [("~q", 0), ("P(x) ^ f(y)", 5), ("P(~x)", 2)])
+def test_validation_error_position(string, position):
+    keep = Formula("p ^ q ^ r ^ s ^ ~q", False)
+    with pytest.raises(ASTValidationError) as error:
+        Formula(string, True)
+    assert describe(error.value, string)["position"] == position
+    assert keep.ast is not None
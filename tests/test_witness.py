@@ -0,0 +1,21 @@
+from formula import Formula, Model, Relation
+
+MODEL = Model([0, 1, 2], {}, {"P": Relation({(0,), (1,)}), "Q": Relation({(2,)})})
+
+
+def test_shadowed_binders_keep_their_witnesses():
+    witness = Formula("exists x. P(x) ^ (exists x. Q(x)) ^ P(x)", True).witness(MODEL)
+    assert witness.value
+    assert witness.bindings == (("x", 0), ("x", 2))
+    assert witness.assignment == {("x", 0): 0, ("x", 1): 2}
+
+
+def test_sibling_binders_sharing_a_name():
+    witness = Formula("(exists x. Q(x)) ^ (exists x. P(x))", True).witness(MODEL)
+    assert witness.assignment == {("x", 0): 2, ("x", 1): 0}
+
+
+def test_counterexample():
+    witness = Formula("forall x. P(x)", True).witness(MODEL)
+    assert not witness.value
+    assert witness.assignment == {("x", 0): 2}
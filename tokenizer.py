@@ -1,3 +1,4 @@
+import re
 from collections import namedtuple
 from string import ascii_letters, digits
 
@@ -25,6 +26,11 @@ class Token:
     def copy(self):
         return Token(self.type, self.data, self.read_data, self.part)
 
+    def unplaced(self):
+        if self.part < 0:
+            return self
+        return Token(self.type, self.data, self.read_data, -1)
+
     def __eq__(self, other):
         if not isinstance(other, Token):
             return NotImplemented
@@ -69,47 +75,43 @@ class TokenList:
         return self.peek_at(self.pos - 1)
 
 
-def symbol_token(string: str, length):
-    symbols = [
-        Symbol("^", ["^", "and", "&"]),
-        Symbol("v", ["v", "or", "|"]),
-        Symbol("->", ["->", "implies"]),
-        Symbol("~", ["~", "not"]),
-        Symbol("forall", ["forall", "A"]),
-        Symbol("exists", ["exists", "E"]),
-        Symbol("==", ["==", "equals"]),
-        Symbol("!=", ["!=", "=/="]),
-        Symbol("(", ["("]),
-        Symbol(")", [")"]),
-        Symbol(".", ["."]),
-        Symbol(",", [","])
-    ]
-    for symbol in symbols:
-        for name in symbol.synonyms:
-            if string.startswith(name):
-                return string[len(name):], Token("sym", symbol.name, name, length - len(string))
-    return string, None
-
-
-def identifier_token(string, length):
-    identifier = ""
-    while string and string[0] in ascii_letters + digits:
-        identifier += string[0]
-        string = string[1:]
-    if identifier:
-        return string, Token("id", identifier, identifier, length - len(string) - len(identifier))
-    return string, None
+SYMBOLS = [
+    Symbol("^", ["^", "and", "&"]),
+    Symbol("v", ["v", "or", "|"]),
+    Symbol("->", ["->", "implies"]),
+    Symbol("~", ["~", "not"]),
+    Symbol("forall", ["forall", "A"]),
+    Symbol("exists", ["exists", "E"]),
+    Symbol("==", ["==", "equals"]),
+    Symbol("!=", ["!=", "=/="]),
+    Symbol("(", ["("]),
+    Symbol(")", [")"]),
+    Symbol(".", ["."]),
+    Symbol(",", [","])
+]
+
+SYNONYMS = {name: symbol.name for symbol in SYMBOLS for name in symbol.synonyms}
+
+TOKEN = re.compile(r"(?:({})|([{}]+))\s*".format(
+    "|".join(re.escape(name) for symbol in SYMBOLS for name in symbol.synonyms),
+    ascii_letters + digits
+))
 
 
 def tokenize(string):
     tokens = TokenList()
+    match = TOKEN.match
+    pos = 0
     length = len(string)
-    while string:
-        string, token = symbol_token(string, length)
-        if not token:
-            string, token = identifier_token(string, length)
-        if not token:
-            raise ValueError(string)
-        tokens.add(token)
-        string = string.lstrip()
+    while pos < length:
+        found = match(string, pos)
+        if not found:
+            raise ValueError(string[pos:])
+        if found.lastindex == 1:
+            name = found.group(1)
+            tokens.add(Token("sym", SYNONYMS[name], name, pos))
+        else:
+            identifier = found.group(2)
+            tokens.add(Token("id", identifier, identifier, pos))
+        pos = found.end()
     return tokens
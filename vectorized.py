@@ -0,0 +1,131 @@
+import numpy as np
+from formula import Model
+from syntax import ASTAnd, ASTOr, ASTImplication, ASTEquality, ASTInequality, ASTNot, ASTExists, ASTForAll,\
+    ASTVariable, ASTPredicate, ASTFunction
+
+
+def table_function(table):
+    return lambda *args: int(table[args])
+
+
+def table_predicate(table):
+    return lambda *args: bool(table[args])
+
+
+class TableModel(Model):
+    def __init__(self, size, functions=None, predicates=None):
+        self.size = size
+        self.function_tables = {name: np.asarray(table, dtype=np.intp) for name, table in (functions or {}).items()}
+        self.predicate_tables = {name: np.asarray(table, dtype=bool) for name, table in (predicates or {}).items()}
+        for name, table in self.function_tables.items():
+            if table.shape != (size,) * table.ndim:
+                raise ValueError(f"Table of Function '{name}' has shape {table.shape}, expected {size} per argument")
+            if table.size and (table.min() < 0 or table.max() >= size):
+                raise ValueError(f"Table of Function '{name}' has values outside universe")
+        for name, table in self.predicate_tables.items():
+            if table.shape != (size,) * table.ndim:
+                raise ValueError(f"Table of Predicate '{name}' has shape {table.shape}, expected {size} per argument")
+        super().__init__(
+            range(size),
+            {name: table_function(table) for name, table in self.function_tables.items()},
+            {name: table_predicate(table) for name, table in self.predicate_tables.items()}
+        )
+
+
+class TensorEvaluator:
+    def __init__(self, model, free, depth):
+        self.model = model
+        self.free = {name: axis for axis, name in enumerate(free)}
+        self.ndim = len(free) + depth
+        self.depth = 0
+
+    def axis(self, node):
+        if isinstance(node.token, int):
+            return len(self.free) + self.depth - 1 - node.token
+        return self.free[node.token]
+
+    def domain(self, axis):
+        shape = [1] * self.ndim
+        shape[axis] = self.model.size
+        return np.arange(self.model.size).reshape(shape)
+
+    def scalar(self, value):
+        return np.asarray(value).reshape((1,) * self.ndim)
+
+    def term(self, node):
+        if isinstance(node, ASTVariable):
+            if isinstance(node.token, int) or node.token in self.free:
+                return self.domain(self.axis(node))
+            return self.scalar(self.table(self.model.function_tables, "Function", node.token))
+        if isinstance(node, ASTFunction):
+            table = self.table(self.model.function_tables, "Function", node.token)
+            return self.apply(table, [self.term(child) for child in node.children])
+        raise ValueError(f"Cannot evaluate '{node.unparse()}' as term")
+
+    def formula(self, node):
+        if isinstance(node, ASTPredicate):
+            table = self.table(self.model.predicate_tables, "Predicate", node.token)
+            return self.apply(table, [self.term(child) for child in node.children])
+        if isinstance(node, ASTEquality):
+            return np.equal(self.term(node.left), self.term(node.right))
+        if isinstance(node, ASTInequality):
+            return np.not_equal(self.term(node.left), self.term(node.right))
+        if isinstance(node, ASTAnd):
+            return np.logical_and(self.formula(node.left), self.formula(node.right))
+        if isinstance(node, ASTOr):
+            return np.logical_or(self.formula(node.left), self.formula(node.right))
+        if isinstance(node, ASTImplication):
+            return np.logical_or(np.logical_not(self.formula(node.left)), self.formula(node.right))
+        if isinstance(node, ASTNot):
+            return np.logical_not(self.formula(node.child))
+        if isinstance(node, (ASTExists, ASTForAll)):
+            axis = len(self.free) + self.depth
+            self.depth += 1
+            child = self.formula(node.child)
+            self.depth -= 1
+            if isinstance(node, ASTExists):
+                return child.any(axis=axis, keepdims=True)
+            return child.all(axis=axis, keepdims=True)
+        raise ValueError(f"Cannot evaluate '{node.unparse()}' as formula")
+
+    def apply(self, table, arguments):
+        if not arguments:
+            return self.scalar(table)
+        if table.ndim != len(arguments):
+            raise ValueError(f"Table arity {table.ndim} does not match {len(arguments)} arguments")
+        return table[tuple(arguments)]
+
+    @staticmethod
+    def table(tables, kind, name):
+        if name not in tables:
+            raise KeyError(f"{kind} '{name}' does not appear in function map")
+        return tables[name]
+
+
+def quantifier_depth(node):
+    depth = max((quantifier_depth(child) for child in node.children), default=0)
+    if isinstance(node, (ASTExists, ASTForAll)):
+        return depth + 1
+    return depth
+
+
+def tensor(ast, model, free=None):
+    if free is None:
+        free = sorted(name for name in ast.free_variables() if name not in model.function_tables)
+    evaluator = TensorEvaluator(model, free, quantifier_depth(ast))
+    result = evaluator.formula(ast)
+    shape = (model.size,) * len(free) + (1,) * (evaluator.ndim - len(free))
+    return np.broadcast_to(result, shape).reshape(shape[:len(free)]), free
+
+
+def evaluate(ast, model, valuation=None):
+    valuation = valuation or {}
+    free = sorted(name for name in ast.free_variables()
+                  if name in valuation or name not in model.function_tables)
+    for name in free:
+        if name not in valuation:
+            raise KeyError(f"Variable '{name}' does not appear in valuation or function map")
+        if not 0 <= valuation[name] < model.size:
+            raise KeyError(f"Value '{valuation[name]}' does not appear in universe")
+    result, free = tensor(ast, model, free)
+    return bool(result[tuple(valuation[name] for name in free)])
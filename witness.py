@@ -0,0 +1,123 @@
+from itertools import product
+from syntax import CompilationContext, ASTAnd, ASTOr, ASTImplication, ASTQuantifier, ASTExists
+
+
+class Witness:
+    def __init__(self, value, entries):
+        self.value = value
+        self.entries = tuple(entries)
+
+    @property
+    def bindings(self):
+        return tuple((name, entry) for _, name, entry in self.entries)
+
+    @property
+    def assignment(self):
+        return {(name, position): entry for position, name, entry in self.entries}
+
+    def report(self):
+        lines = [f"value {self.value}"]
+        if not self.bindings:
+            lines.append("no quantifier decided the value")
+        lines.extend(f"{name} = {entry!r}" for name, entry in self.bindings)
+        return "\n".join(lines)
+
+    def __bool__(self):
+        return bool(self.value)
+
+
+class WitnessContext(CompilationContext):
+    def __init__(self, model, free, trail, binders=0):
+        super().__init__(model, free, None, binders)
+        self.trail = trail
+        self.binder = 0
+
+    def compile(self, node):
+        if isinstance(node, ASTQuantifier):
+            position = self.binder
+            self.binder += 1
+            slot = self.bind()
+            child = self.condition(node.child)
+            self.unbind()
+            return self.quantify(node.name, position, slot, child, isinstance(node, ASTExists))
+        if isinstance(node, ASTAnd):
+            return self.conjunction(self.condition(node.left), self.condition(node.right))
+        if isinstance(node, ASTOr):
+            return self.disjunction(self.condition(node.left), self.condition(node.right))
+        if isinstance(node, ASTImplication):
+            return self.implication(self.condition(node.left), self.condition(node.right))
+        return super().compile(node)
+
+    def quantify(self, name, position, slot, child, target):
+        trail = self.trail
+        universe = self.universe
+        elements = self.elements
+
+        def quantifier(env):
+            mark = len(trail)
+            for entry in universe:
+                env[slot] = entry
+                if bool(child(env)) == target:
+                    trail.insert(mark, (position, name, elements[entry]))
+                    return target
+                del trail[mark:]
+            return not target
+        return quantifier
+
+    def conjunction(self, left, right):
+        trail = self.trail
+
+        def conjunction(env):
+            mark = len(trail)
+            if not left(env):
+                return False
+            middle = len(trail)
+            if right(env):
+                return True
+            del trail[mark:middle]
+            return False
+        return conjunction
+
+    def disjunction(self, left, right):
+        trail = self.trail
+
+        def disjunction(env):
+            mark = len(trail)
+            if left(env):
+                return True
+            middle = len(trail)
+            if not right(env):
+                return False
+            del trail[mark:middle]
+            return True
+        return disjunction
+
+    def implication(self, left, right):
+        trail = self.trail
+
+        def implication(env):
+            mark = len(trail)
+            if not left(env):
+                return True
+            middle = len(trail)
+            if not right(env):
+                return False
+            del trail[mark:middle]
+            return True
+        return implication
+
+
+def satisfying_assignments(compiled, valuation=None):
+    valuation = valuation or {}
+    names = [name for name in compiled.free if name not in valuation and name not in compiled.model.functions]
+    universe = compiled.model.universe
+    if names and not universe:
+        return
+    fixed = compiled.environment({**valuation, **{name: universe[0] for name in names}})
+    slots = [compiled.free.index(name) for name in names]
+    for positions in product(range(len(universe)), repeat=len(names)):
+        env = list(fixed)
+        for slot, position in zip(slots, positions):
+            env[slot] = position
+        if compiled.call(env):
+            yield {name: universe[env[slot]] for slot, name in enumerate(compiled.free)}